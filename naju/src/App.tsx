@@ -1,9 +1,10 @@
-import React, { useEffect, useMemo, useRef, useState } from "react";
+import React, { Suspense, lazy, useEffect, useMemo, useRef, useState } from "react";
 import "./styles.css";
 import HomeDashboard from "./HomeDashboard";
-import ErrorCenter from "./ErrorCenter";
 import { appointmentsToCsv, appointmentsToIcs, downloadTextFile } from "./lib/export";
 import { makeQrSvgDataUrl } from "./lib/qr";
+import { easeOutCubic, onFrame, prefersReducedMotion } from "./lib/anim";
+import { loadThumb, peekThumb } from "./lib/thumbs";
 import {
   Patient,
   PatientFile,
@@ -27,11 +28,32 @@ import {
   createErrorReport,
   deleteErrorReport,
   listErrorReports,
+  readBlobAsDataUrl,
 } from "./lib/api";
 import { buildProfileMap } from "./lib/profile";
 
+// El centro de errores se abre poco: su código se descarga y se monta solo la
+// primera vez que se visita la página, no al arrancar la app.
+const ErrorCenter = lazy(() => import("./ErrorCenter"));
+
 type Section = "resumen" | "examenes" | "notas" | "citas" | "archivos";
 
+const SECTION_TABS: { id: Section; label: string }[] = [
+  { id: "resumen", label: "Resumen" },
+  { id: "examenes", label: "Exámenes" },
+  { id: "notas", label: "Notas" },
+  { id: "citas", label: "Citas" },
+  { id: "archivos", label: "Archivos" },
+];
+
+// Estilos en línea que se repiten en cabeceras y listas: un objeto literal nuevo
+// por render obliga a React a comparar propiedad por propiedad; con la misma
+// referencia el diff del atributo style se salta.
+const MUTED_TEXT: React.CSSProperties = { color: "var(--muted)" };
+const MUTED_SMALL: React.CSSProperties = { color: "var(--muted)", fontSize: 13 };
+const SPACER_12: React.CSSProperties = { height: 12 };
+const HEADER_ROW: React.CSSProperties = { display: "flex", justifyContent: "space-between", alignItems: "center", gap: 10 };
+
 type Toast = { type: "ok" | "err"; msg: string } | null;
 
 function errMsg(e: any) {
@@ -43,27 +65,69 @@ function errMsg(e: any) {
 
 function startVT(fn: () => void) {
   const d: any = document;
-  if (d.startViewTransition) d.startViewTransition(fn);
+  // Con movimiento reducido no hay animación que mostrar: se evita además la
+  // captura de snapshots de toda la página que hace startViewTransition.
+  if (d.startViewTransition && !prefersReducedMotion()) d.startViewTransition(fn);
   else fn();
 }
 
+// Formateadores Intl creados una sola vez: toLocaleString() arma un
+// Intl.DateTimeFormat nuevo (resolución de locale incluida) en cada llamada, y
+// las listas de citas/archivos formatean dos fechas por fila en cada render.
+// DATE_TIME_FMT reproduce el formato por defecto de toLocaleString().
+const DATE_TIME_FMT = new Intl.DateTimeFormat(undefined, {
+  year: "numeric",
+  month: "numeric",
+  day: "numeric",
+  hour: "numeric",
+  minute: "numeric",
+  second: "numeric",
+});
+const SHORT_DATE_FMT = new Intl.DateTimeFormat("es-CO", { day: "2-digit", month: "short", year: "numeric" });
+const MONTH_LABEL_FMT = new Intl.DateTimeFormat(undefined, { month: "long", year: "numeric" });
+
 function isoToNice(iso: string) {
   try {
-    const dt = new Date(iso);
-    return dt.toLocaleString();
+    return DATE_TIME_FMT.format(new Date(iso));
   } catch {
     return iso;
   }
 }
 
+// Edad por fecha de nacimiento. Las fechas de los pacientes no cambian durante
+// la sesión, así que se memoiza; el caché se vacía al cambiar de día.
+const ageCache = new Map<string, number | null>();
+let ageCacheDay = "";
+
 function calcAge(birth: string | null) {
   if (!birth) return null;
-  const d = new Date(birth + "T00:00:00");
-  if (Number.isNaN(d.getTime())) return null;
   const now = new Date();
-  let age = now.getFullYear() - d.getFullYear();
-  const m = now.getMonth() - d.getMonth();
-  if (m < 0 || (m === 0 && now.getDate() < d.getDate())) age--;
+  const today = `${now.getFullYear()}-${now.getMonth()}-${now.getDate()}`;
+  if (today !== ageCacheDay) {
+    ageCache.clear();
+    ageCacheDay = today;
+  }
+  const hit = ageCache.get(birth);
+  if (hit !== undefined) return hit;
+  const age = computeAge(birth, now);
+  ageCache.set(birth, age);
+  return age;
+}
+
+const ISO_DAY_RE = /^(\d{4})-(\d{2})-(\d{2})$/;
+
+function computeAge(birth: string, now: Date) {
+  // birth_date viene de <input type="date"> (YYYY-MM-DD): se leen los números
+  // directamente en vez de construir y validar un Date.
+  const match = ISO_DAY_RE.exec(birth);
+  if (!match) return null;
+  const y = Number(match[1]);
+  const mo = Number(match[2]) - 1;
+  const day = Number(match[3]);
+  if (mo < 0 || mo > 11 || day < 1 || day > 31) return null;
+  let age = now.getFullYear() - y;
+  const m = now.getMonth() - mo;
+  if (m < 0 || (m === 0 && now.getDate() < day)) age--;
   return Math.max(0, age);
 }
 
@@ -74,37 +138,187 @@ function initials(name: string) {
   return (a + b).toUpperCase();
 }
 
+// Misma longitud y mismos objetos en el mismo orden. El store reemplaza (no muta)
+// los registros al editarlos, así que esto basta para saber que nada cambió.
+function sameItems<T>(a: T[], b: T[]) {
+  if (a === b) return true;
+  if (a.length !== b.length) return false;
+  for (let i = 0; i < a.length; i++) if (a[i] !== b[i]) return false;
+  return true;
+}
+
+// Recorta una sola vez: `v.trim() ? v.trim() : null` recorría el texto dos veces.
+function trimOrNull(v: string | null | undefined) {
+  const t = (v ?? "").trim();
+  return t ? t : null;
+}
+
+// Variables CSS del tema, leídas una vez por tema: los efectos de dibujo se
+// re-ejecutan en cada resize/cambio de datos y antes volvían a consultar el
+// estilo computado. La clave es el data-theme real del <html>.
+let rootStyle: CSSStyleDeclaration | null = null;
+const themeVarCache = new Map<string, Map<string, string>>();
+
+function themeVar(name: string, fallback: string) {
+  try {
+    const root = document.documentElement;
+    const key = root.dataset.theme || "";
+    let vars = themeVarCache.get(key);
+    if (!vars) {
+      vars = new Map();
+      themeVarCache.set(key, vars);
+    }
+    let v = vars.get(name);
+    if (v === undefined) {
+      if (!rootStyle) rootStyle = getComputedStyle(root);
+      v = rootStyle.getPropertyValue(name).trim();
+      vars.set(name, v);
+    }
+    return v || fallback;
+  } catch {
+    return fallback;
+  }
+}
+
 function valOrDash(v: string | null | undefined) {
   const t = (v ?? "").trim();
   return t.length ? t : "—";
 }
 
+// meta_json ya parseado por archivo. Los registros del store no se mutan, así
+// que cada JSON se parsea una sola vez aunque lo lean radar, árbol y perfiles.
+// Los resultados son de solo lectura.
+const metaByFile = new WeakMap<PatientFile, any>();
+
 function parseMetaJson(file: PatientFile) {
   if (!file.meta_json) return null;
+  if (metaByFile.has(file)) return metaByFile.get(file);
+  let meta: any = null;
   try {
-    return JSON.parse(file.meta_json);
+    meta = JSON.parse(file.meta_json);
   } catch {
-    return null;
+    meta = null;
   }
+  metaByFile.set(file, meta);
+  return meta;
 }
 
+const IMAGE_EXT_RE = /\.(png|jpg|jpeg|webp|gif)$/i;
+const PDF_EXT_RE = /\.pdf$/i;
+
 function fileIcon(file: PatientFile) {
-  const name = file.filename.toLowerCase();
   if (file.kind === "note") return "📝";
   if (file.kind === "exam") return "🧠";
-  if (name.endsWith(".pdf")) return "📄";
-  if (name.match(/\.(png|jpg|jpeg|webp|gif)$/)) return "🖼️";
+  if (PDF_EXT_RE.test(file.filename)) return "📄";
+  if (IMAGE_EXT_RE.test(file.filename)) return "🖼️";
   return "📎";
 }
 
 function isImage(path: string) {
-  return path.startsWith("data:image/") || /\.(png|jpg|jpeg|webp|gif)$/i.test(path);
+  return path.startsWith("data:image/") || IMAGE_EXT_RE.test(path);
 }
 
 function isPdf(path: string) {
-  return path.startsWith("data:application/pdf") || /\.pdf$/i.test(path);
+  return path.startsWith("data:application/pdf") || PDF_EXT_RE.test(path);
 }
 
+// Avatar de la lista: usa la miniatura cacheada (lib/thumbs) en vez de la foto completa.
+function AvatarThumb({
+  id,
+  src,
+  alt,
+  fallback,
+}: {
+  id: string;
+  src: string;
+  alt: string;
+  fallback: React.ReactNode;
+}) {
+  const [thumb, setThumb] = useState<string | null>(() => peekThumb(id, src));
+
+  useEffect(() => {
+    let alive = true;
+    const hit = peekThumb(id, src);
+    setThumb(hit);
+    if (!hit) {
+      loadThumb(id, src).then((t) => {
+        if (alive) setThumb(t);
+      });
+    }
+    return () => {
+      alive = false;
+    };
+  }, [id, src]);
+
+  return thumb ? <img src={thumb} alt={alt} decoding="async" /> : <>{fallback}</>;
+}
+
+// Tarjeta de paciente del sidebar. Memoizada: al escribir en la búsqueda o
+// cambiar de paciente, React reutiliza las tarjetas cuyos datos no cambiaron
+// en vez de reconstruir toda la lista. Clic/Enter se manejan en la lista (data-id).
+const PatientCard = React.memo(function PatientCard({
+  patient: p,
+  current,
+  accent,
+}: {
+  patient: Patient;
+  current: boolean;
+  accent: string;
+}) {
+  const age = calcAge(p.birth_date);
+  const img = p.photo_path ?? null;
+
+  return (
+    <div
+      className="pCard"
+      role="button"
+      tabIndex={0}
+      aria-current={current ? "true" : "false"}
+      data-id={p.id}
+    >
+      <span className="profileDot" style={{ background: accent }} />
+      <div className="avatar">
+        {p.photo_thumb ? (
+          <img src={p.photo_thumb} alt="Foto paciente" decoding="async" />
+        ) : img ? (
+          <AvatarThumb id={p.id} src={img} alt="Foto paciente" fallback={<div className="initials">{initials(p.name)}</div>} />
+        ) : (
+          <div className="initials">{initials(p.name)}</div>
+        )}
+      </div>
+
+      <div className="pMeta">
+        <div className="pName">{p.name}</div>
+        <div className="pSub">
+          {valOrDash(p.doc_type)} {valOrDash(p.doc_number)} · {valOrDash(p.insurer)}
+        </div>
+        <div className="badges">
+          <span className="badge gold">{age === null ? "Edad —" : `${age} años`}</span>
+          {p.phone ? <span className="badge">{p.phone}</span> : null}
+        </div>
+      </div>
+    </div>
+  );
+});
+
+// Fila de archivo (exámenes, notas, adjuntos). Memoizada: los archivos del store
+// no se mutan, así que al re-renderizar la sección solo se pintan filas nuevas.
+// `onOpen` debe ser estable (p. ej. un setter de useState).
+const FileRow = React.memo(function FileRow({ file: f, onOpen }: { file: PatientFile; onOpen: (f: PatientFile) => void }) {
+  return (
+    <div className="fileRow">
+      <div className="fileIcon">{fileIcon(f)}</div>
+      <div className="fileMeta">
+        <div className="fileName">{f.filename}</div>
+        <div className="fileSub">{isoToNice(f.created_at)}</div>
+      </div>
+      <button className="smallBtn" onClick={() => onOpen(f)}>
+        Abrir
+      </button>
+    </div>
+  );
+});
+
 // --- Ocean background (global) ---
 function WaveSvg({ variant }: { variant: "back" | "front" }) {
   return (
@@ -115,8 +329,19 @@ function WaveSvg({ variant }: { variant: "back" | "front" }) {
 }
 
 function OceanBackground() {
+  // Las olas son animaciones infinitas (una de ellas anima `filter`, que repinta
+  // toda la franja en cada frame). Con la ventana oculta/minimizada se pausan:
+  // el webview de escritorio no siempre las detiene por su cuenta.
+  const [hidden, setHidden] = useState(() => document.visibilityState === "hidden");
+
+  useEffect(() => {
+    const onVis = () => setHidden(document.visibilityState === "hidden");
+    document.addEventListener("visibilitychange", onVis);
+    return () => document.removeEventListener("visibilitychange", onVis);
+  }, []);
+
   return (
-    <div className="ocean" aria-hidden="true">
+    <div className={hidden ? "ocean isPaused" : "ocean"} aria-hidden="true">
       <div className="wave waveBack">
         <div className="waveInner">
           <WaveSvg variant="back" />
@@ -200,22 +425,21 @@ async function decodeAudioToMono16k(blob: Blob): Promise<{ array: Float32Array;
   return { array: new Float32Array(rendered.getChannelData(0)), sampling_rate: 16000 };
 }
 
-function arrayBufferToBase64(buf: ArrayBuffer) {
-  const bytes = new Uint8Array(buf);
-  let binary = "";
-  const CHUNK = 0x8000;
-  for (let i = 0; i < bytes.length; i += CHUNK) {
-    binary += String.fromCharCode(...bytes.subarray(i, i + CHUNK));
-  }
-  return btoa(binary);
+// Base64 nativo vía FileReader: evita copiar el audio a un ArrayBuffer y luego
+// a un string binario intermedio (tres copias de varios MB) antes de btoa.
+async function blobToBase64(blob: Blob): Promise<string> {
+  const url = await readBlobAsDataUrl(blob);
+  return url.slice(url.indexOf(",") + 1);
 }
 
+// Cualquier racha de caracteres no permitidos *o* guiones bajos colapsa a un
+// solo "_" en una pasada; luego solo puede quedar un "_" en cada extremo.
+const FILENAME_BAD_RUN = /[^A-Za-z0-9.\-]+/g;
+const EDGE_UNDERSCORE = /^_|_$/g;
+
 function safeFilename(name: string, fallbackExt = "webm") {
   const base = (name || "").trim();
-  const cleaned = base
-    .replace(/[^\w.\-]+/g, "_")
-    .replace(/_+/g, "_")
-    .replace(/^_+|_+$/g, "");
+  const cleaned = base.replace(FILENAME_BAD_RUN, "_").replace(EDGE_UNDERSCORE, "");
   if (cleaned) return cleaned;
   return `audio-${Date.now()}.${fallbackExt}`;
 }
@@ -236,7 +460,7 @@ async function trySaveAudioAsset(patientId: string, file: File): Promise<string
   try {
     const ext = guessExt(file);
     const filename = safeFilename(file.name, ext);
-    const b64 = arrayBufferToBase64(await file.arrayBuffer());
+    const b64 = await blobToBase64(file);
     const res = await fetch("/__naju_asset", {
       method: "POST",
       headers: { "Content-Type": "application/json" },
@@ -413,7 +637,7 @@ function buildEmotionCounts(files: PatientFile[]) {
 function isoToShortDate(iso: string) {
   const d = new Date(iso);
   if (Number.isNaN(d.getTime())) return iso;
-  return d.toLocaleDateString("es-CO", { day: "2-digit", month: "short", year: "numeric" });
+  return SHORT_DATE_FMT.format(d);
 }
 
 function RadarChart({
@@ -434,11 +658,11 @@ function RadarChart({
   const canvasRef = useRef<HTMLCanvasElement | null>(null);
   const prevRef = useRef<number[] | null>(null);
   const prevCompareRef = useRef<number[] | null>(null);
-  const rafRef = useRef<number | null>(null);
+  const rafRef = useRef<(() => void) | null>(null);
   // Zoom/gestures: we scale the *drawing* (not the DOM element), so the canvas
   // keeps its measured size and always fits the allocated slot.
   const zoomRef = useRef(1);
-  const resetZoomRafRef = useRef<number | null>(null);
+  const resetZoomRafRef = useRef<(() => void) | null>(null);
   const lastMainRef = useRef<number[]>(values);
   const lastCmpRef = useRef<number[] | null>(compareValues ?? null);
   const drawRef = useRef<null | ((main: number[], cmp: number[] | null) => void)>(null);
@@ -458,9 +682,11 @@ function RadarChart({
     const canvas = canvasRef.current;
     const host = canvas?.parentElement;
     if (!canvas || !host || typeof ResizeObserver === "undefined") return;
-    const ro = new ResizeObserver(() => setResizeTick((t) => t + 1));
-    ro.observe(host);
-    return () => ro.disconnect();
+    const stop = observeHostSize(host, () => setResizeTick((t) => t + 1));
+    return () => {
+      stop();
+      releaseCanvasSize(canvas);
+    };
   }, []);
 
   // Zoom with wheel / pinch (mobile) and reset on mouse-leave.
@@ -474,7 +700,7 @@ function RadarChart({
     const clampZoom = (z: number) => Math.max(MIN_Z, Math.min(MAX_Z, z));
 
     const stopReset = () => {
-      if (resetZoomRafRef.current) cancelAnimationFrame(resetZoomRafRef.current);
+      resetZoomRafRef.current?.();
       resetZoomRafRef.current = null;
     };
 
@@ -484,23 +710,46 @@ function RadarChart({
       fn(lastMainRef.current, lastCmpRef.current);
     };
 
+    // Wheel/pinch pueden disparar decenas de eventos por frame (trackpads de alta
+    // resolución): se acumula el zoom y se repinta una sola vez en el siguiente frame.
+    let pendingRedraw: (() => void) | null = null;
+    const scheduleRedraw = () => {
+      if (pendingRedraw) return;
+      pendingRedraw = onFrame(() => {
+        pendingRedraw = null;
+        redraw();
+        return false;
+      });
+    };
+    const cancelRedraw = () => {
+      pendingRedraw?.();
+      pendingRedraw = null;
+    };
+
     const animateReset = () => {
       stopReset();
+      cancelRedraw();
       const from = zoomRef.current;
       if (Math.abs(from - 1) < 0.001) {
         zoomRef.current = 1;
         return;
       }
-      const t0 = performance.now();
+      // El reloj arranca con el timestamp del primer frame (no con
+      // performance.now(), que puede ir por delante y dar t < 0).
+      let t0 = -1;
       const dur = 220;
       const step = (now: number) => {
+        if (t0 < 0) t0 = now;
         const t = Math.min(1, (now - t0) / dur);
-        const e = 1 - Math.pow(1 - t, 3);
-        zoomRef.current = from + (1 - from) * e;
-        redraw();
-        if (t < 1) resetZoomRafRef.current = requestAnimationFrame(step);
+        const e = easeOutCubic(t);
+        const z = from + (1 - from) * e;
+        if (z !== zoomRef.current) {
+          zoomRef.current = z;
+          redraw();
+        }
+        return t < 1;
       };
-      resetZoomRafRef.current = requestAnimationFrame(step);
+      resetZoomRafRef.current = onFrame(step);
     };
 
     const onWheel = (e: WheelEvent) => {
@@ -508,7 +757,7 @@ function RadarChart({
       stopReset();
       const factor = Math.exp(-e.deltaY * 0.0016);
       zoomRef.current = clampZoom(zoomRef.current * factor);
-      redraw();
+      scheduleRedraw();
     };
 
     const onPointerDown = (e: PointerEvent) => {
@@ -534,7 +783,7 @@ function RadarChart({
         const dist = Math.hypot(pts[0].x - pts[1].x, pts[0].y - pts[1].y) || 1;
         const next = st.baseZoom * (dist / (st.baseDist || 1));
         zoomRef.current = clampZoom(next);
-        redraw();
+        scheduleRedraw();
       }
     };
 
@@ -561,6 +810,7 @@ function RadarChart({
 
     return () => {
       stopReset();
+      cancelRedraw();
       st.map.clear();
       canvas.removeEventListener("wheel", onWheel as any);
       canvas.removeEventListener("pointerdown", onPointerDown as any);
@@ -578,49 +828,143 @@ function RadarChart({
     useCanvasSize(canvas);
     const ctx = canvas.getContext("2d")!;
 
-    const prefersReduced = window.matchMedia?.("(prefers-reduced-motion: reduce)")?.matches ?? false;
+    const prefersReduced = prefersReducedMotion();
 
-    const start = performance.now();
+    // Inicio = timestamp del primer frame del ticker (ver animateReset).
+    let start = -1;
     const from = prevRef.current ?? values;
     const to = values;
     const fromCmp = prevCompareRef.current ?? compareValues ?? null;
     const toCmp = compareValues ?? null;
 
-    function easeOutCubic(t: number) {
-      return 1 - Math.pow(1 - t, 3);
-    }
-
     function lerp(a: number, b: number, t: number) {
       return a + (b - a) * t;
     }
 
-    function readVar(name: string, fallback: string) {
-      try {
-        const v = getComputedStyle(document.documentElement).getPropertyValue(name).trim();
-        return v || fallback;
-      } catch {
-        return fallback;
-      }
+    const grid = themeVar("--border", "rgba(199,164,90,0.25)");
+    const axis = themeVar("--muted2", "rgba(120,120,120,0.55)");
+    const text = themeVar("--text", "#2b241d");
+    const muted = themeVar("--muted", "#6b5f55");
+
+    // Último frame dibujado: si nada cambió (p. ej. zoom ya en el límite) no repintamos.
+    let lastFrame: { width: number; height: number; z: number; alpha: number; main: number[]; cmp: number[] | null } | null = null;
+    // Ancho máximo de labels por tamaño de fuente (measureText es caro y no cambia entre frames).
+    const labelWidthByPx = new Map<number, number>();
+
+    function sameValues(a: number[] | null, b: number[] | null) {
+      if (a === b) return true;
+      if (!a || !b || a.length !== b.length) return false;
+      for (let i = 0; i < a.length; i++) if (a[i] !== b[i]) return false;
+      return true;
     }
 
-    const grid = readVar("--border", "rgba(199,164,90,0.25)");
-    const axis = readVar("--muted2", "rgba(120,120,120,0.55)");
-    const text = readVar("--text", "#2b241d");
-    const muted = readVar("--muted", "#6b5f55");
+    // Dirección de cada eje (cos/sin), calculada una vez por efecto: los bucles de
+    // rejilla, ejes, labels y polígonos solo multiplican por el radio.
+    const axisCount = labels.length;
+    const axisCos = new Float64Array(axisCount);
+    const axisSin = new Float64Array(axisCount);
+    for (let i = 0; i < axisCount; i++) {
+      const ang = (Math.PI * 2 * i) / axisCount - Math.PI / 2;
+      axisCos[i] = Math.cos(ang);
+      axisSin[i] = Math.sin(ang);
+    }
+
+    // Capa estática del radar (ver draw): mismo tamaño que el canvas visible.
+    const staticLayer = document.createElement("canvas");
+    const sctx = staticLayer.getContext("2d")!;
+    let staticKey = "";
+
+    function paintStaticLayer(
+      width: number,
+      height: number,
+      dpr: number,
+      z: number,
+      cx: number,
+      cy: number,
+      N: number,
+      radius: number,
+      rings: number,
+      labelPx: number
+    ) {
+      if (staticLayer.width !== width) staticLayer.width = width;
+      if (staticLayer.height !== height) staticLayer.height = height;
+      sctx.setTransform(1, 0, 0, 1, 0, 0);
+      sctx.clearRect(0, 0, width, height);
+
+      // Fondo suave dentro del canvas (se adapta al tema por alpha)
+      sctx.save();
+      sctx.globalAlpha = 0.07;
+      sctx.fillStyle = text;
+      sctx.fillRect(0, 0, width, height);
+      sctx.restore();
+
+      // Zoom drawing around the center (keeps canvas size intact).
+      sctx.save();
+      sctx.translate(cx, cy);
+      sctx.scale(z, z);
+      sctx.translate(-cx, -cy);
+
+      sctx.save();
+      sctx.globalAlpha = 0.8;
+      sctx.strokeStyle = grid;
+      sctx.lineWidth = 1.2 * dpr;
+      for (let r = 1; r <= rings; r++) {
+        const rr = (radius * r) / rings;
+        sctx.beginPath();
+        for (let i = 0; i < N; i++) {
+          const x = cx + axisCos[i] * rr;
+          const y = cy + axisSin[i] * rr;
+          if (i === 0) sctx.moveTo(x, y);
+          else sctx.lineTo(x, y);
+        }
+        sctx.closePath();
+        sctx.stroke();
+      }
+
+      sctx.strokeStyle = axis;
+      sctx.lineWidth = 1.1 * dpr;
+      for (let i = 0; i < N; i++) {
+        sctx.beginPath();
+        sctx.moveTo(cx, cy);
+        sctx.lineTo(cx + axisCos[i] * radius, cy + axisSin[i] * radius);
+        sctx.stroke();
+      }
+      sctx.restore();
+
+      // Labels
+      sctx.save();
+      sctx.fillStyle = muted;
+      sctx.font = `${labelPx}px ui-sans-serif, system-ui`;
+      for (let i = 0; i < N; i++) {
+        const lx = cx + axisCos[i] * (radius + 18 * dpr);
+        const ly = cy + axisSin[i] * (radius + 18 * dpr);
+        const t = labels[i] ?? "";
+        const w = sctx.measureText(t).width;
+        sctx.fillText(t, lx - w / 2, ly + 4 * dpr);
+      }
+      sctx.restore();
+      sctx.restore();
+    }
 
     function draw(main: number[], cmp: number[] | null, alpha = 1) {
       const size = useCanvasSize(canvas);
       if (!size) return;
       const { width, height, dpr } = size;
+      const z0 = zoomRef.current;
+      if (
+        lastFrame &&
+        lastFrame.width === width &&
+        lastFrame.height === height &&
+        lastFrame.z === z0 &&
+        lastFrame.alpha === alpha &&
+        sameValues(lastFrame.main, main) &&
+        sameValues(lastFrame.cmp, cmp)
+      ) {
+        return;
+      }
+      lastFrame = { width, height, z: z0, alpha, main: main.slice(), cmp: cmp ? cmp.slice() : null };
       ctx.clearRect(0, 0, width, height);
 
-      // Fondo suave dentro del canvas (se adapta al tema por alpha)
-      ctx.save();
-      ctx.globalAlpha = 0.07;
-      ctx.fillStyle = text;
-      ctx.fillRect(0, 0, width, height);
-      ctx.restore();
-
       const cx = width / 2;
       const cy = height / 2;
 
@@ -630,10 +974,14 @@ function RadarChart({
       const labelPx = Math.round(
         Math.max(10 * dpr, Math.min(13 * dpr, Math.min(width, height) / 28))
       );
-      ctx.save();
-      ctx.font = `${labelPx}px ui-sans-serif, system-ui`;
-      const maxLabelW = labels.reduce((m, t) => Math.max(m, ctx.measureText(t ?? "").width), 0);
-      ctx.restore();
+      let maxLabelW = labelWidthByPx.get(labelPx);
+      if (maxLabelW === undefined) {
+        ctx.save();
+        ctx.font = `${labelPx}px ui-sans-serif, system-ui`;
+        maxLabelW = labels.reduce((m, t) => Math.max(m, ctx.measureText(t ?? "").width), 0);
+        ctx.restore();
+        labelWidthByPx.set(labelPx, maxLabelW);
+      }
       const basePad = Math.max(26 * dpr, Math.min(width, height) * 0.12);
       const labelPad = maxLabelW / 2 + 26 * dpr;
       // Cap de padding para que el radar no se “encoja” demasiado por textos largos.
@@ -642,66 +990,32 @@ function RadarChart({
       const radius = Math.max(6 * dpr, Math.min(width, height) / 2 - pad);
       const rings = 5;
 
-      // Zoom drawing around the center (keeps canvas size intact).
+      // Fondo, rejilla, ejes y labels no dependen de los valores: se pintan una vez
+      // en un canvas fuera de pantalla y se copian (drawImage) en cada frame de la
+      // animación. Solo se regeneran si cambia el tamaño o el zoom.
       const z = zoomRef.current;
+      const layerKey = `${width}x${height}@${dpr}:${z}`;
+      if (staticKey !== layerKey) {
+        paintStaticLayer(width, height, dpr, z, cx, cy, N, radius, rings, labelPx);
+        staticKey = layerKey;
+      }
+      ctx.drawImage(staticLayer, 0, 0);
+
+      // Zoom drawing around the center (keeps canvas size intact).
       ctx.save();
       ctx.translate(cx, cy);
       ctx.scale(z, z);
       ctx.translate(-cx, -cy);
 
-      ctx.save();
-      ctx.globalAlpha = 0.8;
-      ctx.strokeStyle = grid;
-      ctx.lineWidth = 1.2 * dpr;
-      for (let r = 1; r <= rings; r++) {
-        const rr = (radius * r) / rings;
-        ctx.beginPath();
-        for (let i = 0; i < N; i++) {
-          const ang = (Math.PI * 2 * i) / N - Math.PI / 2;
-          const x = cx + Math.cos(ang) * rr;
-          const y = cy + Math.sin(ang) * rr;
-          if (i === 0) ctx.moveTo(x, y);
-          else ctx.lineTo(x, y);
-        }
-        ctx.closePath();
-        ctx.stroke();
-      }
-
-      ctx.strokeStyle = axis;
-      ctx.lineWidth = 1.1 * dpr;
-      for (let i = 0; i < N; i++) {
-        const ang = (Math.PI * 2 * i) / N - Math.PI / 2;
-        ctx.beginPath();
-        ctx.moveTo(cx, cy);
-        ctx.lineTo(cx + Math.cos(ang) * radius, cy + Math.sin(ang) * radius);
-        ctx.stroke();
-      }
-      ctx.restore();
-
-      // Labels
-      ctx.save();
-      ctx.fillStyle = muted;
-      ctx.font = `${labelPx}px ui-sans-serif, system-ui`;
-      for (let i = 0; i < N; i++) {
-        const ang = (Math.PI * 2 * i) / N - Math.PI / 2;
-        const lx = cx + Math.cos(ang) * (radius + 18 * dpr);
-        const ly = cy + Math.sin(ang) * (radius + 18 * dpr);
-        const t = labels[i] ?? "";
-        const w = ctx.measureText(t).width;
-        ctx.fillText(t, lx - w / 2, ly + 4 * dpr);
-      }
-      ctx.restore();
-
       // Polygon (main)
       const stroke = dominantColor;
       ctx.save();
       ctx.globalAlpha = alpha;
       ctx.beginPath();
       for (let i = 0; i < N; i++) {
-        const ang = (Math.PI * 2 * i) / N - Math.PI / 2;
         const rr = (radius * Math.max(0, Math.min(max, main[i] ?? 0))) / max;
-        const x = cx + Math.cos(ang) * rr;
-        const y = cy + Math.sin(ang) * rr;
+        const x = cx + axisCos[i] * rr;
+        const y = cy + axisSin[i] * rr;
         if (i === 0) ctx.moveTo(x, y);
         else ctx.lineTo(x, y);
       }
@@ -727,10 +1041,9 @@ function RadarChart({
         ctx.strokeStyle = text;
         ctx.beginPath();
         for (let i = 0; i < N; i++) {
-          const ang = (Math.PI * 2 * i) / N - Math.PI / 2;
           const rr = (radius * Math.max(0, Math.min(max, cmp[i] ?? 0))) / max;
-          const x = cx + Math.cos(ang) * rr;
-          const y = cy + Math.sin(ang) * rr;
+          const x = cx + axisCos[i] * rr;
+          const y = cy + axisSin[i] * rr;
           if (i === 0) ctx.moveTo(x, y);
           else ctx.lineTo(x, y);
         }
@@ -749,40 +1062,108 @@ function RadarChart({
     // Allow external (gesture) redraws with the most recent values
     drawRef.current = (main: number[], cmp: number[] | null) => draw(main, cmp, 1);
 
-    if (rafRef.current) cancelAnimationFrame(rafRef.current);
+    rafRef.current?.();
 
     const duration = prefersReduced ? 1 : 340;
 
+    let lastE = -1;
     const tick = (now: number) => {
+      if (start < 0) start = now;
       const t = duration === 1 ? 1 : Math.min(1, (now - start) / duration);
       const e = easeOutCubic(t);
+      // Mismo progreso que el frame anterior: nada que interpolar ni pintar.
+      if (e === lastE) return t < 1;
+      lastE = e;
       const main = values.map((_, i) => lerp(from[i] ?? 0, to[i] ?? 0, e));
       const cmp = toCmp
         ? toCmp.map((_, i) => lerp((fromCmp?.[i] ?? 0), (toCmp?.[i] ?? 0), e))
         : null;
       draw(main, cmp, 1);
-      if (t < 1) rafRef.current = requestAnimationFrame(tick);
+      return t < 1;
     };
 
-    rafRef.current = requestAnimationFrame(tick);
+    rafRef.current = onFrame(tick);
 
     prevRef.current = values;
     prevCompareRef.current = compareValues ?? null;
 
     return () => {
-      if (rafRef.current) cancelAnimationFrame(rafRef.current);
+      rafRef.current?.();
+      rafRef.current = null;
     };
   }, [labels, values, compareValues, accent, max, dominantColor, theme, resizeTick]);
 
   return <canvas ref={canvasRef} className="radarCanvas" aria-label="Perfil radial del paciente" />;
 }
 
+// Tamaño CSS de cada canvas, mantenido por un ResizeObserver compartido.
+// Así draw() no fuerza un getBoundingClientRect (layout síncrono) en cada frame.
+const canvasCssSize = new WeakMap<HTMLCanvasElement, { w: number; h: number }>();
+const canvasSizeRO =
+  typeof ResizeObserver === "undefined"
+    ? null
+    : new ResizeObserver((entries) => {
+        for (const e of entries) {
+          const box = e.borderBoxSize?.[0];
+          canvasCssSize.set(
+            e.target as HTMLCanvasElement,
+            box ? { w: box.inlineSize, h: box.blockSize } : { w: e.contentRect.width, h: e.contentRect.height }
+          );
+        }
+      });
+
+/**
+ * Observes `host` and calls `onChange` at most once per frame, and only when its
+ * rounded size actually changed (dragging the window fires many callbacks per
+ * frame, some with an identical size). Returns a stop function.
+ */
+function observeHostSize(host: Element, onChange: () => void) {
+  let lastW = -1;
+  let lastH = -1;
+  let pending: (() => void) | null = null;
+  const ro = new ResizeObserver((entries) => {
+    const r = entries[entries.length - 1].contentRect;
+    const w = Math.round(r.width);
+    const h = Math.round(r.height);
+    if (w === lastW && h === lastH) return;
+    lastW = w;
+    lastH = h;
+    if (pending) return;
+    pending = onFrame(() => {
+      pending = null;
+      onChange();
+      return false;
+    });
+  });
+  ro.observe(host);
+  return () => {
+    ro.disconnect();
+    pending?.();
+    pending = null;
+  };
+}
+
+function releaseCanvasSize(canvas: HTMLCanvasElement | null) {
+  if (!canvas) return;
+  canvasSizeRO?.unobserve(canvas);
+  canvasCssSize.delete(canvas);
+}
+
 function useCanvasSize(canvas: HTMLCanvasElement | null) {
   if (!canvas) return null;
   const dpr = window.devicePixelRatio || 1;
-  const rect = canvas.getBoundingClientRect();
-  const width = Math.max(1, Math.round(rect.width * dpr));
-  const height = Math.max(1, Math.round(rect.height * dpr));
+  let css = canvasCssSize.get(canvas);
+  if (!css) {
+    // Primera medición (o navegador sin ResizeObserver): se lee del layout.
+    const rect = canvas.getBoundingClientRect();
+    css = { w: rect.width, h: rect.height };
+    if (canvasSizeRO) {
+      canvasCssSize.set(canvas, css);
+      canvasSizeRO.observe(canvas);
+    }
+  }
+  const width = Math.max(1, Math.round(css.w * dpr));
+  const height = Math.max(1, Math.round(css.h * dpr));
   if (canvas.width !== width || canvas.height !== height) {
     canvas.width = width;
     canvas.height = height;
@@ -854,6 +1235,51 @@ function buildEvidence(files: PatientFile[], labels: string[]) {
   return evidence;
 }
 
+function hexToRgb(hex: string) {
+  const h = hex.replace("#", "").trim();
+  if (h.length === 3) {
+    const r = parseInt(h[0] + h[0], 16);
+    const g = parseInt(h[1] + h[1], 16);
+    const b = parseInt(h[2] + h[2], 16);
+    return { r, g, b };
+  }
+  if (h.length >= 6) {
+    const r = parseInt(h.slice(0, 2), 16);
+    const g = parseInt(h.slice(2, 4), 16);
+    const b = parseInt(h.slice(4, 6), 16);
+    return { r, g, b };
+  }
+  return null;
+}
+
+// color -> prefijo "rgba(r, g, b, " (null si no se puede parsear). La paleta es
+// pequeña y fija, así que el parseo hex/rgb se hace una sola vez por color en
+// vez de en cada nodo de cada frame.
+const rgbaPrefixCache = new Map<string, string | null>();
+
+function rgbaPrefix(color: string) {
+  const hit = rgbaPrefixCache.get(color);
+  if (hit !== undefined) return hit;
+  let prefix: string | null = null;
+  // Accept rgba()/rgb()/hex.
+  if (color.startsWith("rgba(") || color.startsWith("rgb(")) {
+    const inner = color.slice(color.indexOf("(") + 1, -1);
+    const parts = inner.split(",").map((s) => s.trim());
+    if (parts.length >= 3) prefix = `rgba(${parts[0]}, ${parts[1]}, ${parts[2]}, `;
+  } else {
+    const rgb = hexToRgb(color);
+    if (rgb) prefix = `rgba(${rgb.r}, ${rgb.g}, ${rgb.b}, `;
+  }
+  rgbaPrefixCache.set(color, prefix);
+  return prefix;
+}
+
+function withAlpha(color: string, a: number) {
+  // If we can't parse, return as-is.
+  const prefix = rgbaPrefix(color);
+  return prefix === null ? color : prefix + a + ")";
+}
+
 function TrendCanvas({
   labels,
   files,
@@ -869,10 +1295,10 @@ function TrendCanvas({
 }) {
   const treeRef = useRef<HTMLCanvasElement | null>(null);
   const wrapRef = useRef<HTMLDivElement | null>(null);
-  const rafRef = useRef<number | null>(null);
+  const rafRef = useRef<(() => void) | null>(null);
   // Zoom/gestures (same concept as RadarChart): scale the drawing, keep the slot size.
   const zoomRef = useRef(1);
-  const resetZoomRafRef = useRef<number | null>(null);
+  const resetZoomRafRef = useRef<(() => void) | null>(null);
   const lastProgressRef = useRef(1);
   const drawRef = useRef<null | ((progress?: number) => void)>(null);
   const pointersRef = useRef<{ map: Map<number, { x: number; y: number }>; baseDist: number; baseZoom: number }>(
@@ -880,13 +1306,25 @@ function TrendCanvas({
   );
   const [resizeTick, setResizeTick] = useState(0);
   const [tip, setTip] = useState<null | { x: number; y: number; title: string; sub?: string }>(null);
+  // Bandera en vez de consultar `tip`/el DOM: mousemove, wheel y pointerdown
+  // llegan en ráfagas y solo el primer ocultado necesita tocar el estado.
+  const tipShownRef = useRef(false);
+  const hideTip = () => {
+    if (!tipShownRef.current) return;
+    tipShownRef.current = false;
+    setTip(null);
+  };
 
   useEffect(() => {
     const host = wrapRef.current;
+    // Se captura aquí: al desmontar, React ya puso treeRef.current en null.
+    const canvas = treeRef.current;
     if (!host || typeof ResizeObserver === "undefined") return;
-    const ro = new ResizeObserver(() => setResizeTick((t) => t + 1));
-    ro.observe(host);
-    return () => ro.disconnect();
+    const stop = observeHostSize(host, () => setResizeTick((t) => t + 1));
+    return () => {
+      stop();
+      releaseCanvasSize(canvas);
+    };
   }, []);
 
   // Zoom with wheel / pinch (mobile) and reset on mouse-leave.
@@ -900,7 +1338,7 @@ function TrendCanvas({
     const clampZoom = (z: number) => Math.max(MIN_Z, Math.min(MAX_Z, z));
 
     const stopReset = () => {
-      if (resetZoomRafRef.current) cancelAnimationFrame(resetZoomRafRef.current);
+      resetZoomRafRef.current?.();
       resetZoomRafRef.current = null;
     };
 
@@ -917,22 +1355,28 @@ function TrendCanvas({
         zoomRef.current = 1;
         return;
       }
-      const t0 = performance.now();
+      // El reloj arranca con el timestamp del primer frame (no con
+      // performance.now(), que puede ir por delante y dar t < 0).
+      let t0 = -1;
       const dur = 220;
       const step = (now: number) => {
+        if (t0 < 0) t0 = now;
         const t = Math.min(1, (now - t0) / dur);
-        const e = 1 - Math.pow(1 - t, 3);
-        zoomRef.current = from + (1 - from) * e;
-        redraw();
-        if (t < 1) resetZoomRafRef.current = requestAnimationFrame(step);
+        const e = easeOutCubic(t);
+        const z = from + (1 - from) * e;
+        if (z !== zoomRef.current) {
+          zoomRef.current = z;
+          redraw();
+        }
+        return t < 1;
       };
-      resetZoomRafRef.current = requestAnimationFrame(step);
+      resetZoomRafRef.current = onFrame(step);
     };
 
     const onWheel = (e: WheelEvent) => {
       e.preventDefault();
       stopReset();
-      setTip(null);
+      hideTip();
       const factor = Math.exp(-e.deltaY * 0.0016);
       zoomRef.current = clampZoom(zoomRef.current * factor);
       redraw();
@@ -940,7 +1384,7 @@ function TrendCanvas({
 
     const onPointerDown = (e: PointerEvent) => {
       stopReset();
-      setTip(null);
+      hideTip();
       try {
         canvas.setPointerCapture(e.pointerId);
       } catch {
@@ -977,7 +1421,7 @@ function TrendCanvas({
 
     const onLeave = () => {
       st.map.clear();
-      setTip(null);
+      hideTip();
       animateReset();
     };
 
@@ -1007,21 +1451,12 @@ function TrendCanvas({
     if (!size) return;
     const ctx = canvas.getContext("2d")!;
 
-    const prefersReduced = window.matchMedia?.("(prefers-reduced-motion: reduce)")?.matches ?? false;
-
-    function readVar(name: string, fallback: string) {
-      try {
-        const v = getComputedStyle(document.documentElement).getPropertyValue(name).trim();
-        return v || fallback;
-      } catch {
-        return fallback;
-      }
-    }
+    const prefersReduced = prefersReducedMotion();
 
     // Palette from current theme variables
-    const text = readVar("--text", "#2b241d");
-    const muted = readVar("--muted", "#6b5f55");
-    const panel = readVar("--panel", "rgba(255,255,255,.75)");
+    const text = themeVar("--text", "#2b241d");
+    const muted = themeVar("--muted", "#6b5f55");
+    const panel = themeVar("--panel", "rgba(255,255,255,.75)");
 
     const evidence = buildEvidence(files, labels);
     const sum = macroValues.reduce((acc, v) => acc + v, 0) || 1;
@@ -1043,40 +1478,6 @@ function TrendCanvas({
     const row1 = clamp(mTop + availH * 0.46, root.y + rootR + 36 * dpr, height - mBottom - 140 * dpr);
     const row2 = clamp(height - mBottom - 28 * dpr, row1 + 84 * dpr, height - 54 * dpr);
     const xs = labels.map((_, i) => mSide + (i * (width - mSide * 2)) / Math.max(1, labels.length - 1));
-    function hexToRgb(hex: string) {
-      const h = hex.replace("#", "").trim();
-      if (h.length === 3) {
-        const r = parseInt(h[0] + h[0], 16);
-        const g = parseInt(h[1] + h[1], 16);
-        const b = parseInt(h[2] + h[2], 16);
-        return { r, g, b };
-      }
-      if (h.length >= 6) {
-        const r = parseInt(h.slice(0, 2), 16);
-        const g = parseInt(h.slice(2, 4), 16);
-        const b = parseInt(h.slice(4, 6), 16);
-        return { r, g, b };
-      }
-      return null;
-    }
-    function withAlpha(color: string, a: number) {
-      // Accept rgba()/rgb()/hex. If we can't parse, return as-is.
-      if (color.startsWith("rgba(")) {
-        const inner = color.slice(5, -1);
-        const parts = inner.split(",").map((s) => s.trim());
-        if (parts.length >= 3) return `rgba(${parts[0]}, ${parts[1]}, ${parts[2]}, ${a})`;
-        return color;
-      }
-      if (color.startsWith("rgb(")) {
-        const inner = color.slice(4, -1);
-        const parts = inner.split(",").map((s) => s.trim());
-        if (parts.length >= 3) return `rgba(${parts[0]}, ${parts[1]}, ${parts[2]}, ${a})`;
-        return color;
-      }
-      const rgb = hexToRgb(color);
-      if (!rgb) return color;
-      return `rgba(${rgb.r}, ${rgb.g}, ${rgb.b}, ${a})`;
-    }
     function drawEdge(ax: number, ay: number, ar: number, bx: number, by: number, br: number, stroke: string, w: number, alpha: number) {
       ctx.save();
       ctx.globalAlpha = alpha;
@@ -1173,7 +1574,94 @@ function TrendCanvas({
     }
 
     type Hit = { kind: "root" | "macro" | "leaf"; x: number; y: number; r: number; title: string; sub?: string };
-    const hits: Hit[] = [];
+    type LeafLayout = { x: number; r: number; pct: number; edgeW: number; centerText: string; label: string; sub: string };
+    type MacroLayout = {
+      x: number;
+      r: number;
+      color: string;
+      ring: number;
+      edgeW: number;
+      centerText: string;
+      label: string;
+      sub: string;
+      leaves: LeafLayout[];
+    };
+
+    // Layout precalculado: posiciones, colores, textos y hits no dependen del
+    // progreso de la animación, así que se calculan una vez por efecto y cada
+    // frame solo recorre esta lista (antes: sort de evidencias, lectura de CSS
+    // vars y formateo de strings en cada frame).
+    const avg = macroValues.length ? macroValues.reduce((a, b) => a + b, 0) / macroValues.length : 0;
+    const rootColor = themeVar("--profile-accent", "#c7a45a");
+    const rootRing = clamp(avg / Math.max(1, max), 0, 1);
+    const rootCenterText = `${avg.toFixed(1)}/${max}`;
+    const hits: Hit[] = [
+      { kind: "root", x: root.x, y: root.y, r: rootR, title: "Perfil global", sub: `Promedio: ${avg.toFixed(1)}/${max}` },
+    ];
+
+    const macros: MacroLayout[] = labels.map((label, idx) => {
+      const x = xs[idx];
+      const w = weights[idx] ?? 0;
+      const c = PROFILE_COLORS[label] ?? rootColor;
+      const macroR = (12 + 8 * w) * dpr;
+      const val = macroValues[idx] ?? 0;
+
+      // Leaves data (top 2)
+      const bucket = evidence[idx];
+      const total = Array.from(bucket.values()).reduce((a, b) => a + b, 0) || 1;
+      const entries = Array.from(bucket.entries()).sort((a, b) => b[1] - a[1]).slice(0, 2);
+
+      hits.push({ kind: "macro", x, y: row1, r: macroR, title: label, sub: `Peso: ${(w * 100).toFixed(0)}% · Valor: ${val.toFixed(1)}/${max}` });
+
+      // Leaves (micro evidence) — se ubican dentro de la "columna" del macro
+      // para evitar que se salgan o se monten cuando el canvas se estrecha.
+      const leaves = entries.map(([value, count], j): LeafLayout => {
+        const pct = clamp(count / total, 0, 1);
+        const leafR = (11 + 8 * pct) * dpr;
+
+        const slotLeft = idx === 0 ? mSide : (xs[idx - 1] + x) / 2;
+        const slotRight = idx === labels.length - 1 ? width - mSide : (x + xs[idx + 1]) / 2;
+        const slotW = Math.max(1, slotRight - slotLeft);
+        const baseOff = clamp(slotW * 0.22, 26 * dpr, 56 * dpr);
+
+        const dir = j === 0 ? -1 : 1;
+        let lx = x + dir * baseOff;
+        // Mantener dentro del slot y respetar radios
+        lx = clamp(lx, slotLeft + leafR + 2 * dpr, slotRight - leafR - 2 * dpr);
+        // Asegurar separación mínima con el macro
+        const minSep = macroR + leafR + 10 * dpr;
+        if (Math.abs(lx - x) < minSep) {
+          lx = clamp(x + dir * minSep, slotLeft + leafR + 2 * dpr, slotRight - leafR - 2 * dpr);
+        }
+
+        hits.push({ kind: "leaf", x: lx, y: row2, r: leafR, title: `${label} · ${value}`, sub: `Evidencias: ${count} · ${(pct * 100).toFixed(0)}% del total (${total})` });
+
+        return {
+          x: lx,
+          r: leafR,
+          pct,
+          edgeW: (1.2 + pct * 3.6) * dpr,
+          centerText: `${Math.round(pct * 100)}%`,
+          label: String(value),
+          sub: `${count} evidencia(s)`,
+        };
+      });
+
+      return {
+        x,
+        r: macroR,
+        color: c,
+        ring: clamp(val / Math.max(1, max), 0, 1),
+        edgeW: (1.3 + w * 4.4) * dpr,
+        centerText: `${val.toFixed(1)}`,
+        label,
+        sub: `${(w * 100).toFixed(0)}% · ${val.toFixed(1)}/${max}`,
+        leaves,
+      };
+    });
+
+    // Store hits in dataset for pointer events (lightweight: attach to canvas)
+    (canvas as any).__hits = hits;
 
     function draw(progress: number) {
       ctx.clearRect(0, 0, width, height);
@@ -1197,8 +1685,6 @@ function TrendCanvas({
       ctx.fillText("Raíz = global • Ramas = macro • Hojas = micro-evidencias", 16 * dpr, 42 * dpr);
       ctx.restore();
 
-      hits.length = 0;
-
       // Keep last progress for gesture-based redraws
       lastProgressRef.current = progress;
 
@@ -1211,125 +1697,82 @@ function TrendCanvas({
       ctx.scale(z, z);
       ctx.translate(-zx, -zy);
 
-      // Root (global)
-      const avg = macroValues.length ? macroValues.reduce((a, b) => a + b, 0) / macroValues.length : 0;
-      const rootColor = readVar("--profile-accent", "#c7a45a");
-
       // Root -> macros edges (curved)
-      xs.forEach((x, idx) => {
-        const w = weights[idx] ?? 0;
-        const lw = (1.3 + w * 4.4) * dpr;
-        const c = PROFILE_COLORS[labels[idx]] ?? rootColor;
-        drawEdge(root.x, root.y, rootR, x, row1, (12 + 8 * w) * dpr, c, lw, 0.55 * progress);
-      });
+      for (const m of macros) {
+        drawEdge(root.x, root.y, rootR, m.x, row1, m.r, m.color, m.edgeW, 0.55 * progress);
+      }
 
+      // Root (global)
       drawNode({
         x: root.x,
         y: root.y,
         r: rootR,
         color: rootColor,
-        ringPct: clamp(avg / Math.max(1, max), 0, 1) * progress,
-        centerText: `${avg.toFixed(1)}/${max}`,
+        ringPct: rootRing * progress,
+        centerText: rootCenterText,
         label: "Perfil global",
         sub: "Resumen del filtro actual",
         labelMode: "above",
       });
 
-      hits.push({ kind: "root", x: root.x, y: root.y, r: rootR, title: "Perfil global", sub: `Promedio: ${avg.toFixed(1)}/${max}` });
-
       // Macro nodes + leaves
-      labels.forEach((label, idx) => {
-        const x = xs[idx];
-        const w = weights[idx] ?? 0;
-        const c = PROFILE_COLORS[label] ?? rootColor;
-        const macroR = (12 + 8 * w) * dpr;
-        const val = macroValues[idx] ?? 0;
-
-        // Leaves data (top 2)
-        const bucket = evidence[idx];
-        const total = Array.from(bucket.values()).reduce((a, b) => a + b, 0) || 1;
-        const entries = Array.from(bucket.entries()).sort((a, b) => b[1] - a[1]).slice(0, 2);
-
-        // Macro node
+      for (const m of macros) {
         drawNode({
-          x,
+          x: m.x,
           y: row1,
-          r: macroR,
-          color: c,
-          ringPct: clamp(val / Math.max(1, max), 0, 1) * progress,
-          centerText: `${val.toFixed(1)}`,
-          label,
-          sub: `${(w * 100).toFixed(0)}% · ${val.toFixed(1)}/${max}`,
+          r: m.r,
+          color: m.color,
+          ringPct: m.ring * progress,
+          centerText: m.centerText,
+          label: m.label,
+          sub: m.sub,
           labelMode: "below",
         });
 
-        hits.push({ kind: "macro", x, y: row1, r: macroR, title: label, sub: `Peso: ${(w * 100).toFixed(0)}% · Valor: ${val.toFixed(1)}/${max}` });
-
-        // Leaves (micro evidence) — se ubican dentro de la "columna" del macro
-        // para evitar que se salgan o se monten cuando el canvas se estrecha.
-        entries.forEach(([value, count], j) => {
-          const pct = clamp(count / total, 0, 1);
-          const leafR = (11 + 8 * pct) * dpr;
-
-          const slotLeft = idx === 0 ? mSide : (xs[idx - 1] + x) / 2;
-          const slotRight = idx === labels.length - 1 ? width - mSide : (x + xs[idx + 1]) / 2;
-          const slotW = Math.max(1, slotRight - slotLeft);
-          const baseOff = clamp(slotW * 0.22, 26 * dpr, 56 * dpr);
-
-          const dir = j === 0 ? -1 : 1;
-          let lx = x + dir * baseOff;
-          // Mantener dentro del slot y respetar radios
-          lx = clamp(lx, slotLeft + leafR + 2 * dpr, slotRight - leafR - 2 * dpr);
-          // Asegurar separación mínima con el macro
-          const minSep = macroR + leafR + 10 * dpr;
-          if (Math.abs(lx - x) < minSep) {
-            lx = clamp(x + dir * minSep, slotLeft + leafR + 2 * dpr, slotRight - leafR - 2 * dpr);
-          }
-
-          const ly = row2;
-
+        for (const leaf of m.leaves) {
           // Edge macro -> leaf
-          drawEdge(x, row1, macroR, lx, ly, leafR, c, (1.2 + pct * 3.6) * dpr, 0.50 * progress);
+          drawEdge(m.x, row1, m.r, leaf.x, row2, leaf.r, m.color, leaf.edgeW, 0.50 * progress);
 
           // Leaf node (ring shows pct)
           drawNode({
-            x: lx,
-            y: ly,
-            r: leafR,
-            color: c,
-            ringPct: pct * progress,
-            centerText: `${Math.round(pct * 100)}%`,
-            label: String(value),
-            sub: `${count} evidencia(s)`,
+            x: leaf.x,
+            y: row2,
+            r: leaf.r,
+            color: m.color,
+            ringPct: leaf.pct * progress,
+            centerText: leaf.centerText,
+            label: leaf.label,
+            sub: leaf.sub,
             labelMode: "below",
           });
-
-          hits.push({ kind: "leaf", x: lx, y: ly, r: leafR, title: `${label} · ${value}`, sub: `Evidencias: ${count} · ${(pct * 100).toFixed(0)}% del total (${total})` });
-        });
-      });
+        }
+      }
 
       ctx.restore();
-
-      // Store hits in dataset for pointer events (lightweight: attach to canvas)
-      (canvas as any).__hits = hits;
     }
 
     // Allow external (gesture) redraws with the most recent progress
     drawRef.current = (progress: number = 1) => draw(progress);
 
-    if (rafRef.current) cancelAnimationFrame(rafRef.current);
-    const t0 = performance.now();
+    rafRef.current?.();
+    let t0 = -1;
+    let lastP = -1;
     const duration = prefersReduced ? 1 : 320;
     const tick = (now: number) => {
+      if (t0 < 0) t0 = now;
       const t = duration === 1 ? 1 : Math.min(1, (now - t0) / duration);
-      const p = 1 - Math.pow(1 - t, 3);
-      draw(p);
-      if (t < 1) rafRef.current = requestAnimationFrame(tick);
+      const p = easeOutCubic(t);
+      if (p !== lastP) {
+        lastP = p;
+        draw(p);
+      }
+      return t < 1;
     };
-    rafRef.current = requestAnimationFrame(tick);
+    rafRef.current = onFrame(tick);
 
     return () => {
-      if (rafRef.current) cancelAnimationFrame(rafRef.current);
+      rafRef.current?.();
+      rafRef.current = null;
     };
   }, [labels, files, macroValues, max, theme, resizeTick]);
 
@@ -1356,10 +1799,11 @@ function TrendCanvas({
     });
 
     if (!hit) {
-      setTip(null);
+      hideTip();
       return;
     }
     const wrapRect = wrap.getBoundingClientRect();
+    tipShownRef.current = true;
     setTip({
       x: e.clientX - wrapRect.left + 14,
       y: e.clientY - wrapRect.top + 12,
@@ -1375,7 +1819,7 @@ function TrendCanvas({
         className="trendCanvas treeCanvas"
         aria-label="Árbol de tendencias"
         onMouseMove={onMove}
-        onMouseLeave={() => setTip(null)}
+        onMouseLeave={hideTip}
       />
       {tip ? (
         <div className="chartTip" style={{ left: tip.x, top: tip.y }}>
@@ -1678,6 +2122,176 @@ function PatientForm({
   );
 }
 
+// Esquema del examen mental: cada campo declara su clave en el payload, su
+// etiqueta y su control. El formulario se genera recorriendo este arreglo y el
+// payload se arma con el mismo recorrido (no hay dos listas que mantener).
+type MseField =
+  | { kind: "text"; key: string; label: string; placeholder: string }
+  | { kind: "textarea"; key: string; label: string; placeholder: string }
+  | { kind: "select"; key: string; label: string; options: readonly string[] };
+
+type MseSection = { fields: readonly MseField[]; notes?: MseField };
+
+const MSE_MOTIVO: MseField = {
+  kind: "text",
+  key: "motivo_consulta",
+  label: "Motivo de consulta",
+  placeholder: "Ej: ansiedad, insomnio, duelo…",
+};
+
+const MSE_SECTIONS: readonly MseSection[] = [
+  {
+    fields: [
+      { kind: "text", key: "lugar_entrevista", label: "Lugar de la entrevista", placeholder: "Consultorio, domicilio, hospital..." },
+      { kind: "text", key: "acompanante", label: "Acompañante", placeholder: "Ej: Familiar, amigo, ninguno" },
+      { kind: "text", key: "edad_aparente", label: "Edad aparente", placeholder: "Ej: acorde a la edad, menor..." },
+      { kind: "text", key: "contextura_fisica", label: "Contextura física", placeholder: "Ej: delgado, atlético..." },
+      { kind: "text", key: "caracteristicas_etnicas", label: "Características étnicas", placeholder: "Describe si es relevante" },
+      { kind: "text", key: "estatura_para_la_edad", label: "Estatura para la edad", placeholder: "Ej: acorde, baja, alta" },
+      { kind: "select", key: "arreglo_personal", label: "Arreglo personal", options: ["Adecuado", "Descuidado", "Hipercuidado", "Desaliñado"] },
+    ],
+  },
+  {
+    fields: [
+      { kind: "select", key: "contacto_visual", label: "Contacto visual", options: ["Intermitente", "Sostenido", "Mirada perpleja", "Evitativo"] },
+      { kind: "select", key: "contacto_verbal", label: "Contacto verbal", options: ["Normal", "Escaso", "Esporádico", "Abundante"] },
+      {
+        kind: "select",
+        key: "actitud",
+        label: "Actitud hacia el examinador",
+        options: [
+          "Colaboradora",
+          "Hostil",
+          "Indiferente",
+          "Desdeñoso",
+          "Evasivo",
+          "Altivo",
+          "Hiperfamiliar",
+          "Intrusivo",
+          "Suspicaz",
+          "Congraciante",
+          "Seductora",
+          "Hipersexual",
+        ],
+      },
+      { kind: "select", key: "lenguaje", label: "Lenguaje", options: ["Normal", "Hipoproductivo", "Taquifemia", "Incoherente"] },
+      { kind: "select", key: "estado_de_animo", label: "Estado de ánimo", options: ["Eutímico", "Ansioso", "Deprimido", "Irritable", "Expansivo"] },
+      { kind: "select", key: "afecto", label: "Afecto", options: ["Congruente", "Lábil", "Aplanado", "Inapropiado", "Ambivalente", "Incongruente"] },
+      { kind: "select", key: "pensamiento_curso", label: "Curso del pensamiento", options: ["Lógico/Coherente", "Tangencial", "Disgregado", "Fuga de ideas"] },
+      { kind: "select", key: "pensamiento_nexos_asociativos", label: "Nexos asociativos", options: ["Coherentes", "Incoherentes", "Asíndesis"] },
+      { kind: "select", key: "pensamiento_relevancia", label: "Relevancia", options: ["Relevante", "Irrelevante", "Circunstancial", "Tangencial"] },
+      {
+        kind: "select",
+        key: "percepcion",
+        label: "Percepción",
+        options: ["Sin alteraciones", "Alucinaciones", "Ilusiones", "Despersonalización", "Pseudoalucinaciones", "Alucinosis"],
+      },
+    ],
+    notes: {
+      kind: "textarea",
+      key: "pensamiento_contenido",
+      label: "Contenido del pensamiento",
+      placeholder: "Ideas obsesivas, rumiación, delirios, preocupación, etc…",
+    },
+  },
+  {
+    fields: [
+      { kind: "select", key: "orientacion", label: "Orientación", options: ["Orientado", "Parcialmente orientado", "Desorientado"] },
+      { kind: "select", key: "sensorio", label: "Sensorio", options: ["Alerta", "Somnoliento", "Estuporoso", "Coma"] },
+      { kind: "select", key: "atencion", label: "Atención", options: ["Conservada", "Disminuida", "Fluctuante"] },
+      { kind: "select", key: "memoria", label: "Memoria", options: ["Conservada", "Alterada"] },
+      { kind: "select", key: "calculo", label: "Cálculo", options: ["Eucalculia", "Discalculia"] },
+      { kind: "select", key: "abstraccion", label: "Abstracción", options: ["Abstrae", "Concreto"] },
+      { kind: "select", key: "juicio", label: "Juicio", options: ["Conservado", "Parcial", "Comprometido"] },
+      { kind: "select", key: "insight", label: "Insight", options: ["Presente", "Parcial", "Ausente"] },
+      { kind: "select", key: "riesgo", label: "Riesgo", options: ["Sin riesgo aparente", "Riesgo bajo", "Riesgo moderado", "Riesgo alto"] },
+    ],
+    notes: {
+      kind: "textarea",
+      key: "observaciones",
+      label: "Observaciones",
+      placeholder: "Observaciones clínicas adicionales (sensorio, juicio, riesgo, etc.)…",
+    },
+  },
+  {
+    fields: [
+      {
+        kind: "select",
+        key: "actividad_motora_cuantitativa",
+        label: "Índice de actividad motora (cuantitativo)",
+        options: ["Euquinético", "Hiperquinético", "Hipoquinético"],
+      },
+      { kind: "select", key: "tono_muscular", label: "Tono muscular", options: ["Normotónico", "Hipertónico", "Hipotónico"] },
+      { kind: "select", key: "posicion", label: "Posición / postura", options: ["Postura habitual", "Posturas estereotipadas", "Inhibida"] },
+      {
+        kind: "select",
+        key: "movimientos",
+        label: "Movimientos",
+        options: [
+          "Adaptativos",
+          "Tics",
+          "Temblores",
+          "Estereotipias",
+          "Gesticulaciones",
+          "Manierismos",
+          "Convulsiones",
+          "Bloqueo motriz",
+          "Parálisis",
+          "Compulsión",
+        ],
+      },
+    ],
+  },
+];
+
+// Todos los campos en orden, y sus valores iniciales (selector = primera opción).
+const MSE_FIELDS: readonly MseField[] = [
+  MSE_MOTIVO,
+  ...MSE_SECTIONS.flatMap((s) => (s.notes ? [...s.fields, s.notes] : s.fields)),
+];
+
+const MSE_DEFAULTS: Readonly<Record<string, string>> = Object.fromEntries(
+  MSE_FIELDS.map((f) => [f.key, f.kind === "select" ? f.options[0] : ""])
+);
+
+// Un control del examen. Memoizado: al escribir en un campo solo se re-renderiza
+// ese control; `setValues` es el setter estable del useState del modal.
+const MseInput = React.memo(function MseInput({
+  field,
+  value,
+  setValues,
+  style,
+}: {
+  field: MseField;
+  value: string;
+  setValues: React.Dispatch<React.SetStateAction<Record<string, string>>>;
+  style?: React.CSSProperties;
+}) {
+  const onChange = (e: React.ChangeEvent<HTMLInputElement | HTMLSelectElement | HTMLTextAreaElement>) => {
+    const v = e.target.value;
+    setValues((prev) => (prev[field.key] === v ? prev : { ...prev, [field.key]: v }));
+  };
+
+  return (
+    <div className="field" style={style}>
+      <div className="label">{field.label}</div>
+      {field.kind === "select" ? (
+        <select className="select" value={value} onChange={onChange}>
+          {field.options.map((o) => (
+            <option key={o}>{o}</option>
+          ))}
+        </select>
+      ) : field.kind === "textarea" ? (
+        <textarea className="textarea" value={value} onChange={onChange} placeholder={field.placeholder} />
+      ) : (
+        <input className="input" value={value} onChange={onChange} placeholder={field.placeholder} />
+      )}
+    </div>
+  );
+});
+
+const MSE_NOTES_STYLE: React.CSSProperties = { marginTop: 10 };
+
 function MentalExamModal({
   patient,
   onClose,
@@ -1689,96 +2303,28 @@ function MentalExamModal({
 }) {
   const [busy, setBusy] = useState(false);
 
-  const [fecha, setFecha] = useState<string>(() => {
-    const d = new Date();
-    const yyyy = d.getFullYear();
-    const mm = String(d.getMonth() + 1).padStart(2, "0");
-    const dd = String(d.getDate()).padStart(2, "0");
-    return `${yyyy}-${mm}-${dd}`;
-  });
+  // Fecha no controlada: el <input type="date"> guarda su propio valor y solo se
+  // lee al guardar, así cambiarla no re-renderiza todo el formulario.
+  const [fechaDefault] = useState(() => toDayKeyLocal(new Date()));
+  const fechaRef = useRef<HTMLInputElement | null>(null);
 
-  const [motivo, setMotivo] = useState("");
-  const [lugarEntrevista, setLugarEntrevista] = useState("");
-  const [acompanante, setAcompanante] = useState("");
-  const [edadAparente, setEdadAparente] = useState("");
-  const [contextura, setContextura] = useState("");
-  const [etnia, setEtnia] = useState("");
-  const [estaturaEdad, setEstaturaEdad] = useState("");
-  const [arregloPersonal, setArregloPersonal] = useState("Adecuado");
-
-  const [contactoVisual, setContactoVisual] = useState("Intermitente");
-  const [contactoVerbal, setContactoVerbal] = useState("Normal");
-  const [actitud, setActitud] = useState("Colaboradora");
-
-  const [actividadCuant, setActividadCuant] = useState("Euquinético");
-  const [tonoMuscular, setTonoMuscular] = useState("Normotónico");
-  const [posicion, setPosicion] = useState("Postura habitual");
-  const [movimientos, setMovimientos] = useState("Adaptativos");
-
-  const [lenguaje, setLenguaje] = useState("Normal");
-  const [animo, setAnimo] = useState("Eutímico");
-  const [afecto, setAfecto] = useState("Congruente");
-  const [cursoPens, setCursoPens] = useState("Lógico/Coherente");
-  const [nexosAsociativos, setNexosAsociativos] = useState("Coherentes");
-  const [relevanciaPens, setRelevanciaPens] = useState("Relevante");
-  const [contPens, setContPens] = useState("");
-  const [percepcion, setPercepcion] = useState("Sin alteraciones");
-  const [orientacion, setOrientacion] = useState("Orientado");
-  const [sensorio, setSensorio] = useState("Alerta");
-  const [atencion, setAtencion] = useState("Conservada");
-  const [memoria, setMemoria] = useState("Conservada");
-  const [calculo, setCalculo] = useState("Eucalculia");
-  const [abstraccion, setAbstraccion] = useState("Abstrae");
-  const [juicio, setJuicio] = useState("Conservado");
-  const [insight, setInsight] = useState("Presente");
-  const [riesgo, setRiesgo] = useState("Sin riesgo aparente");
-  const [obs, setObs] = useState("");
+  const [values, setValues] = useState<Record<string, string>>(() => ({ ...MSE_DEFAULTS }));
 
   async function create() {
     setBusy(true);
     try {
+      // Si el usuario borró la fecha se guarda vacía, como con el input controlado.
+      const fecha = fechaRef.current?.value ?? fechaDefault;
+      // Selectores siempre tienen valor; los campos libres vacíos se guardan como null.
+      const fields: Record<string, string | null> = {};
+      for (const f of MSE_FIELDS) {
+        const v = values[f.key];
+        fields[f.key] = f.kind === "select" ? v : v || null;
+      }
       const payload = {
         type: "examen_mental",
         fecha,
-        motivo_consulta: motivo || null,
-
-        lugar_entrevista: lugarEntrevista || null,
-        acompanante: acompanante || null,
-        edad_aparente: edadAparente || null,
-        contextura_fisica: contextura || null,
-        caracteristicas_etnicas: etnia || null,
-        estatura_para_la_edad: estaturaEdad || null,
-        arreglo_personal: arregloPersonal,
-
-        contacto_visual: contactoVisual,
-        contacto_verbal: contactoVerbal,
-        actitud: actitud,
-
-        actividad_motora_cuantitativa: actividadCuant,
-        tono_muscular: tonoMuscular,
-        posicion: posicion,
-        movimientos: movimientos,
-
-        lenguaje,
-        estado_de_animo: animo,
-        afecto,
-
-        pensamiento_curso: cursoPens,
-        pensamiento_nexos_asociativos: nexosAsociativos,
-        pensamiento_relevancia: relevanciaPens,
-        pensamiento_contenido: contPens || null,
-
-        percepcion,
-        orientacion,
-        sensorio,
-        atencion,
-        memoria,
-        calculo,
-        abstraccion,
-        juicio,
-        insight,
-        riesgo,
-        observaciones: obs || null,
+        ...fields,
 
         patient_snapshot: {
           id: patient.id,
@@ -1806,360 +2352,25 @@ function MentalExamModal({
         <div className="formGrid">
           <div className="field">
             <div className="label">Fecha</div>
-            <input type="date" className="input" value={fecha} onChange={(e) => setFecha(e.target.value)} />
+            <input ref={fechaRef} type="date" className="input" defaultValue={fechaDefault} />
           </div>
 
-          <div className="field">
-            <div className="label">Motivo de consulta</div>
-            <input
-              className="input"
-              value={motivo}
-              onChange={(e) => setMotivo(e.target.value)}
-              placeholder="Ej: ansiedad, insomnio, duelo…"
-            />
-          </div>
-        </div>
-
-        <div className="card">
-          <div className="formGrid">
-            <div className="field">
-              <div className="label">Lugar de la entrevista</div>
-              <input
-                className="input"
-                value={lugarEntrevista}
-                onChange={(e) => setLugarEntrevista(e.target.value)}
-                placeholder="Consultorio, domicilio, hospital..."
-              />
-            </div>
-
-            <div className="field">
-              <div className="label">Acompañante</div>
-              <input
-                className="input"
-                value={acompanante}
-                onChange={(e) => setAcompanante(e.target.value)}
-                placeholder="Ej: Familiar, amigo, ninguno"
-              />
-            </div>
-
-            <div className="field">
-              <div className="label">Edad aparente</div>
-              <input
-                className="input"
-                value={edadAparente}
-                onChange={(e) => setEdadAparente(e.target.value)}
-                placeholder="Ej: acorde a la edad, menor..."
-              />
-            </div>
-
-            <div className="field">
-              <div className="label">Contextura física</div>
-              <input
-                className="input"
-                value={contextura}
-                onChange={(e) => setContextura(e.target.value)}
-                placeholder="Ej: delgado, atlético..."
-              />
-            </div>
-
-            <div className="field">
-              <div className="label">Características étnicas</div>
-              <input
-                className="input"
-                value={etnia}
-                onChange={(e) => setEtnia(e.target.value)}
-                placeholder="Describe si es relevante"
-              />
-            </div>
-
-            <div className="field">
-              <div className="label">Estatura para la edad</div>
-              <input
-                className="input"
-                value={estaturaEdad}
-                onChange={(e) => setEstaturaEdad(e.target.value)}
-                placeholder="Ej: acorde, baja, alta"
-              />
-            </div>
-
-            <div className="field">
-              <div className="label">Arreglo personal</div>
-              <select className="select" value={arregloPersonal} onChange={(e) => setArregloPersonal(e.target.value)}>
-                <option>Adecuado</option>
-                <option>Descuidado</option>
-                <option>Hipercuidado</option>
-                <option>Desaliñado</option>
-              </select>
-            </div>
-          </div>
+          <MseInput field={MSE_MOTIVO} value={values[MSE_MOTIVO.key]} setValues={setValues} />
         </div>
 
-        <div className="card">
-          <div className="formGrid">
-            <div className="field">
-              <div className="label">Contacto visual</div>
-              <select className="select" value={contactoVisual} onChange={(e) => setContactoVisual(e.target.value)}>
-                <option>Intermitente</option>
-                <option>Sostenido</option>
-                <option>Mirada perpleja</option>
-                <option>Evitativo</option>
-              </select>
-            </div>
-
-            <div className="field">
-              <div className="label">Contacto verbal</div>
-              <select className="select" value={contactoVerbal} onChange={(e) => setContactoVerbal(e.target.value)}>
-                <option>Normal</option>
-                <option>Escaso</option>
-                <option>Esporádico</option>
-                <option>Abundante</option>
-              </select>
-            </div>
-
-            <div className="field">
-              <div className="label">Actitud hacia el examinador</div>
-              <select className="select" value={actitud} onChange={(e) => setActitud(e.target.value)}>
-                <option>Colaboradora</option>
-                <option>Hostil</option>
-                <option>Indiferente</option>
-                <option>Desdeñoso</option>
-                <option>Evasivo</option>
-                <option>Altivo</option>
-                <option>Hiperfamiliar</option>
-                <option>Intrusivo</option>
-                <option>Suspicaz</option>
-                <option>Congraciante</option>
-                <option>Seductora</option>
-                <option>Hipersexual</option>
-              </select>
-            </div>
-
-            <div className="field">
-              <div className="label">Lenguaje</div>
-              <select className="select" value={lenguaje} onChange={(e) => setLenguaje(e.target.value)}>
-                <option>Normal</option>
-                <option>Hipoproductivo</option>
-                <option>Taquifemia</option>
-                <option>Incoherente</option>
-              </select>
-            </div>
-
-            <div className="field">
-              <div className="label">Estado de ánimo</div>
-              <select className="select" value={animo} onChange={(e) => setAnimo(e.target.value)}>
-                <option>Eutímico</option>
-                <option>Ansioso</option>
-                <option>Deprimido</option>
-                <option>Irritable</option>
-                <option>Expansivo</option>
-              </select>
-            </div>
-
-            <div className="field">
-              <div className="label">Afecto</div>
-              <select className="select" value={afecto} onChange={(e) => setAfecto(e.target.value)}>
-                <option>Congruente</option>
-                <option>Lábil</option>
-                <option>Aplanado</option>
-                <option>Inapropiado</option>
-                <option>Ambivalente</option>
-                <option>Incongruente</option>
-              </select>
-            </div>
-
-            <div className="field">
-              <div className="label">Curso del pensamiento</div>
-              <select className="select" value={cursoPens} onChange={(e) => setCursoPens(e.target.value)}>
-                <option>Lógico/Coherente</option>
-                <option>Tangencial</option>
-                <option>Disgregado</option>
-                <option>Fuga de ideas</option>
-              </select>
-            </div>
-
-            <div className="field">
-              <div className="label">Nexos asociativos</div>
-              <select className="select" value={nexosAsociativos} onChange={(e) => setNexosAsociativos(e.target.value)}>
-                <option>Coherentes</option>
-                <option>Incoherentes</option>
-                <option>Asíndesis</option>
-              </select>
-            </div>
-
-            <div className="field">
-              <div className="label">Relevancia</div>
-              <select className="select" value={relevanciaPens} onChange={(e) => setRelevanciaPens(e.target.value)}>
-                <option>Relevante</option>
-                <option>Irrelevante</option>
-                <option>Circunstancial</option>
-                <option>Tangencial</option>
-              </select>
-            </div>
-
-            <div className="field">
-              <div className="label">Percepción</div>
-              <select className="select" value={percepcion} onChange={(e) => setPercepcion(e.target.value)}>
-                <option>Sin alteraciones</option>
-                <option>Alucinaciones</option>
-                <option>Ilusiones</option>
-                <option>Despersonalización</option>
-                <option>Pseudoalucinaciones</option>
-                <option>Alucinosis</option>
-              </select>
-            </div>
-          </div>
-
-          <div className="field" style={{ marginTop: 10 }}>
-            <div className="label">Contenido del pensamiento</div>
-            <textarea
-              className="textarea"
-              value={contPens}
-              onChange={(e) => setContPens(e.target.value)}
-              placeholder="Ideas obsesivas, rumiación, delirios, preocupación, etc…"
-            />
-          </div>
-        </div>
-
-        <div className="card">
-          <div className="formGrid">
-            <div className="field">
-              <div className="label">Orientación</div>
-              <select className="select" value={orientacion} onChange={(e) => setOrientacion(e.target.value)}>
-                <option>Orientado</option>
-                <option>Parcialmente orientado</option>
-                <option>Desorientado</option>
-              </select>
-            </div>
-
-            <div className="field">
-              <div className="label">Sensorio</div>
-              <select className="select" value={sensorio} onChange={(e) => setSensorio(e.target.value)}>
-                <option>Alerta</option>
-                <option>Somnoliento</option>
-                <option>Estuporoso</option>
-                <option>Coma</option>
-              </select>
-            </div>
-
-            <div className="field">
-              <div className="label">Atención</div>
-              <select className="select" value={atencion} onChange={(e) => setAtencion(e.target.value)}>
-                <option>Conservada</option>
-                <option>Disminuida</option>
-                <option>Fluctuante</option>
-              </select>
-            </div>
-
-            <div className="field">
-              <div className="label">Memoria</div>
-              <select className="select" value={memoria} onChange={(e) => setMemoria(e.target.value)}>
-                <option>Conservada</option>
-                <option>Alterada</option>
-              </select>
-            </div>
-
-            <div className="field">
-              <div className="label">Cálculo</div>
-              <select className="select" value={calculo} onChange={(e) => setCalculo(e.target.value)}>
-                <option>Eucalculia</option>
-                <option>Discalculia</option>
-              </select>
-            </div>
-
-            <div className="field">
-              <div className="label">Abstracción</div>
-              <select className="select" value={abstraccion} onChange={(e) => setAbstraccion(e.target.value)}>
-                <option>Abstrae</option>
-                <option>Concreto</option>
-              </select>
-            </div>
-
-            <div className="field">
-              <div className="label">Juicio</div>
-              <select className="select" value={juicio} onChange={(e) => setJuicio(e.target.value)}>
-                <option>Conservado</option>
-                <option>Parcial</option>
-                <option>Comprometido</option>
-              </select>
-            </div>
-
-            <div className="field">
-              <div className="label">Insight</div>
-              <select className="select" value={insight} onChange={(e) => setInsight(e.target.value)}>
-                <option>Presente</option>
-                <option>Parcial</option>
-                <option>Ausente</option>
-              </select>
-            </div>
-
-            <div className="field">
-              <div className="label">Riesgo</div>
-              <select className="select" value={riesgo} onChange={(e) => setRiesgo(e.target.value)}>
-                <option>Sin riesgo aparente</option>
-                <option>Riesgo bajo</option>
-                <option>Riesgo moderado</option>
-                <option>Riesgo alto</option>
-              </select>
-            </div>
-          </div>
-
-          <div className="field" style={{ marginTop: 10 }}>
-            <div className="label">Observaciones</div>
-            <textarea
-              className="textarea"
-              value={obs}
-              onChange={(e) => setObs(e.target.value)}
-              placeholder="Observaciones clínicas adicionales (sensorio, juicio, riesgo, etc.)…"
-            />
-          </div>
-        </div>
-
-        <div className="card">
-          <div className="formGrid">
-            <div className="field">
-              <div className="label">Índice de actividad motora (cuantitativo)</div>
-              <select className="select" value={actividadCuant} onChange={(e) => setActividadCuant(e.target.value)}>
-                <option>Euquinético</option>
-                <option>Hiperquinético</option>
-                <option>Hipoquinético</option>
-              </select>
-            </div>
-
-            <div className="field">
-              <div className="label">Tono muscular</div>
-              <select className="select" value={tonoMuscular} onChange={(e) => setTonoMuscular(e.target.value)}>
-                <option>Normotónico</option>
-                <option>Hipertónico</option>
-                <option>Hipotónico</option>
-              </select>
-            </div>
-
-            <div className="field">
-              <div className="label">Posición / postura</div>
-              <select className="select" value={posicion} onChange={(e) => setPosicion(e.target.value)}>
-                <option>Postura habitual</option>
-                <option>Posturas estereotipadas</option>
-                <option>Inhibida</option>
-              </select>
+        {MSE_SECTIONS.map((section, i) => (
+          <div key={i} className="card mseSection">
+            <div className="formGrid">
+              {section.fields.map((f) => (
+                <MseInput key={f.key} field={f} value={values[f.key]} setValues={setValues} />
+              ))}
             </div>
 
-            <div className="field">
-              <div className="label">Movimientos</div>
-              <select className="select" value={movimientos} onChange={(e) => setMovimientos(e.target.value)}>
-                <option>Adaptativos</option>
-                <option>Tics</option>
-                <option>Temblores</option>
-                <option>Estereotipias</option>
-                <option>Gesticulaciones</option>
-                <option>Manierismos</option>
-                <option>Convulsiones</option>
-                <option>Bloqueo motriz</option>
-                <option>Parálisis</option>
-                <option>Compulsión</option>
-              </select>
-            </div>
+            {section.notes ? (
+              <MseInput field={section.notes} value={values[section.notes.key]} setValues={setValues} style={MSE_NOTES_STYLE} />
+            ) : null}
           </div>
-        </div>
+        ))}
       </div>
 
       <div className="modalFooter">
@@ -2230,14 +2441,23 @@ function NoteModal({
     return `http://${ip}:${port}/?${qp.toString()}`;
   }, [hostIp, netPort, patient.id]);
 
+  // El QR se codifica con debounce: al escribir la IP a mano cada tecla cambiaba
+  // shareUrl y regeneraba el SVG completo. Solo se genera 150 ms después de la
+  // última tecla (el enlace de texto sí se actualiza al instante).
+  const [qrUrl, setQrUrl] = useState(shareUrl);
+  useEffect(() => {
+    const t = window.setTimeout(() => setQrUrl(shareUrl), 150);
+    return () => window.clearTimeout(t);
+  }, [shareUrl]);
+
   const qrDataUrl = useMemo(() => {
-    if (!shareUrl) return "";
+    if (!qrUrl) return "";
     try {
-      return makeQrSvgDataUrl(shareUrl);
+      return makeQrSvgDataUrl(qrUrl);
     } catch {
       return "";
     }
-  }, [shareUrl]);
+  }, [qrUrl]);
 
   async function copyShareUrl() {
     if (!shareUrl) return;
@@ -2268,13 +2488,9 @@ function NoteModal({
   const [transcribing, setTranscribing] = useState(false);
   const [transcribeError, setTranscribeError] = useState<string | null>(null);
 
-  const [fecha, setFecha] = useState<string>(() => {
-    const d = new Date();
-    const yyyy = d.getFullYear();
-    const mm = String(d.getMonth() + 1).padStart(2, "0");
-    const dd = String(d.getDate()).padStart(2, "0");
-    return `${yyyy}-${mm}-${dd}`;
-  });
+  // Fecha no controlada (ver MentalExamModal): se lee del input al usarla.
+  const [fechaDefault] = useState(() => toDayKeyLocal(new Date()));
+  const fechaRef = useRef<HTMLInputElement | null>(null);
   const [animo, setAnimo] = useState("Eutímico");
   const [riesgo, setRiesgo] = useState("Sin riesgo");
   const [texto, setTexto] = useState("");
@@ -2293,15 +2509,6 @@ function NoteModal({
     };
   }, [audioUrl]);
 
-  async function readBlobAsDataUrl(blob: Blob): Promise<string> {
-    return new Promise((resolve, reject) => {
-      const reader = new FileReader();
-      reader.onerror = () => reject(new Error("No se pudo leer el audio"));
-      reader.onload = () => resolve(String(reader.result));
-      reader.readAsDataURL(blob);
-    });
-  }
-
   function actionPickAudio() {
     audioInputRef.current?.click();
   }
@@ -2364,7 +2571,7 @@ function NoteModal({
 
         try {
           const ext = "webm";
-          const file = new File([blob], `grabacion-${fecha}-${Date.now()}.${ext}`, {
+          const file = new File([blob], `grabacion-${fechaRef.current?.value ?? fechaDefault}-${Date.now()}.${ext}`, {
             type: blob.type || "audio/webm",
           });
 
@@ -2434,14 +2641,16 @@ function NoteModal({
         audioRef = savedPath || (await readBlobAsDataUrl(audioFile));
       }
 
+      // Si el usuario borró la fecha se guarda vacía, como con el input controlado.
+      const fecha = fechaRef.current?.value ?? fechaDefault;
       const payload = {
         type: "nota",
         fecha,
         estado_animo: animo,
         riesgo,
-        texto: texto.trim() ? texto.trim() : null,
-        continuidad: continuidad.trim() ? continuidad.trim() : null,
-        transcripcion: transcripcion.trim() ? transcripcion.trim() : null,
+        texto: trimOrNull(texto),
+        continuidad: trimOrNull(continuidad),
+        transcripcion: trimOrNull(transcripcion),
         audio_data_url: audioRef,
         patient_snapshot: {
           id: patient.id,
@@ -2537,7 +2746,7 @@ function NoteModal({
         <div className="formGrid">
           <div className="field">
             <div className="label">Fecha</div>
-            <input type="date" className="input" value={fecha} onChange={(e) => setFecha(e.target.value)} />
+            <input ref={fechaRef} type="date" className="input" defaultValue={fechaDefault} />
           </div>
 
           <div className="field">
@@ -2627,6 +2836,31 @@ function NoteModal({
   );
 }
 
+// Tablas etiqueta -> clave de meta_json para la vista previa: se arman una vez
+// en lugar de construir un arreglo de pares en cada render del modal.
+const EXAM_PREVIEW_FIELDS: readonly (readonly [string, string])[] = [
+  ["Apariencia", "apariencia_aspecto_personal"],
+  ["Conducta", "conducta_psicomotora"],
+  ["Actitud", "actitud"],
+  ["Lenguaje", "lenguaje"],
+  ["Ánimo", "estado_de_animo"],
+  ["Afecto", "afecto"],
+  ["Curso pensamiento", "pensamiento_curso"],
+  ["Percepción", "percepcion"],
+  ["Orientación", "orientacion"],
+  ["Atención", "atencion"],
+  ["Memoria", "memoria"],
+  ["Juicio", "juicio"],
+  ["Insight", "insight"],
+  ["Riesgo", "riesgo"],
+];
+
+const NOTE_PREVIEW_FIELDS: readonly (readonly [string, string])[] = [
+  ["Estado de ánimo", "estado_animo"],
+  ["Riesgo", "riesgo"],
+  ["Plan de trabajo", "continuidad"],
+];
+
 function FilePreviewModal({
   file,
   onClose,
@@ -2648,7 +2882,7 @@ function FilePreviewModal({
         {file.kind === "attachment" ? (
           <div className="previewBody">
             {isImageFile ? (
-              <img className="previewImage" src={file.path} alt={`Vista previa de ${file.filename}`} />
+              <img className="previewImage" src={file.path} alt={`Vista previa de ${file.filename}`} decoding="async" />
             ) : isPdfFile ? (
               <object className="previewPdf" data={file.path} type="application/pdf">
                 <p>Vista previa no disponible.</p>
@@ -2656,7 +2890,7 @@ function FilePreviewModal({
             ) : (
               <div className="previewEmpty">
                 <div style={{ fontWeight: 700 }}>Archivo adjunto</div>
-                <div style={{ color: "var(--muted)" }}>Descarga para abrir este tipo de archivo.</div>
+                <div style={MUTED_TEXT}>Descarga para abrir este tipo de archivo.</div>
               </div>
             )}
             <a className="pillBtn" href={file.path} download={file.filename}>
@@ -2675,25 +2909,10 @@ function FilePreviewModal({
               <div className="v">{meta?.motivo_consulta ?? "—"}</div>
             </div>
             <div className="previewGrid">
-              {[
-                ["Apariencia", meta?.apariencia_aspecto_personal],
-                ["Conducta", meta?.conducta_psicomotora],
-                ["Actitud", meta?.actitud],
-                ["Lenguaje", meta?.lenguaje],
-                ["Ánimo", meta?.estado_de_animo],
-                ["Afecto", meta?.afecto],
-                ["Curso pensamiento", meta?.pensamiento_curso],
-                ["Percepción", meta?.percepcion],
-                ["Orientación", meta?.orientacion],
-                ["Atención", meta?.atencion],
-                ["Memoria", meta?.memoria],
-                ["Juicio", meta?.juicio],
-                ["Insight", meta?.insight],
-                ["Riesgo", meta?.riesgo],
-              ].map(([label, value]) => (
+              {EXAM_PREVIEW_FIELDS.map(([label, key]) => (
                 <div key={label} className="previewItem">
                   <div className="k">{label}</div>
-                  <div className="v">{value ?? "—"}</div>
+                  <div className="v">{meta?.[key] ?? "—"}</div>
                 </div>
               ))}
             </div>
@@ -2707,14 +2926,10 @@ function FilePreviewModal({
               <div className="v">{meta?.fecha ?? "—"}</div>
             </div>
             <div className="previewGrid">
-              {[
-                ["Estado de ánimo", meta?.estado_animo],
-                ["Riesgo", meta?.riesgo],
-                ["Plan de trabajo", meta?.continuidad],
-              ].map(([label, value]) => (
+              {NOTE_PREVIEW_FIELDS.map(([label, key]) => (
                 <div key={label} className="previewItem">
                   <div className="k">{label}</div>
-                  <div className="v">{value ?? "—"}</div>
+                  <div className="v">{meta?.[key] ?? "—"}</div>
                 </div>
               ))}
             </div>
@@ -2757,7 +2972,7 @@ function toDayKeyLocal(d: Date) {
 
 function monthLabel(d: Date) {
   try {
-    return d.toLocaleString(undefined, { month: "long", year: "numeric" });
+    return MONTH_LABEL_FMT.format(d);
   } catch {
     return `${d.getFullYear()}-${String(d.getMonth() + 1).padStart(2, "0")}`;
   }
@@ -2775,14 +2990,18 @@ function buildMonthGrid(monthCursor: Date) {
   end.setDate(end.getDate() + (6 - dowEnd));
 
   const days: Date[] = [];
+  const keys: string[] = [];
   const cur = new Date(start);
   while (cur <= end) {
     days.push(new Date(cur));
+    keys.push(toDayKeyLocal(cur));
     cur.setDate(cur.getDate() + 1);
   }
-  return { days };
+  return { days, keys };
 }
 
+const CAL_DOW = ["Lun", "Mar", "Mié", "Jue", "Vie", "Sáb", "Dom"];
+
 function AgendaView(props: AgendaViewProps) {
   const { appointments, patients, monthCursor, setMonthCursor, dayKey, setDayKey, onJumpToPatient, onExportAll, onExportAllCsv } = props;
 
@@ -2804,7 +3023,7 @@ function AgendaView(props: AgendaViewProps) {
     return m;
   }, [appointments]);
 
-  const { days } = useMemo(() => buildMonthGrid(monthCursor), [monthCursor]);
+  const { days, keys } = useMemo(() => buildMonthGrid(monthCursor), [monthCursor]);
 
   const selectedList = useMemo(() => {
     if (!dayKey) return [];
@@ -2820,12 +3039,9 @@ function AgendaView(props: AgendaViewProps) {
       .slice(0, 30);
   }, [appointments]);
 
-  function fmt(iso: string) {
-    try {
-      return new Date(iso).toLocaleString();
-    } catch {
-      return iso;
-    }
+  function onCalClick(e: React.MouseEvent<HTMLDivElement>) {
+    const k = (e.target as HTMLElement).closest<HTMLElement>("[data-day]")?.dataset.day;
+    if (k) setDayKey(dayKey === k ? null : k);
   }
 
   return (
@@ -2834,7 +3050,7 @@ function AgendaView(props: AgendaViewProps) {
         <div style={{ display: "flex", justifyContent: "space-between", gap: 10, alignItems: "center" }}>
           <div>
             <div style={{ fontWeight: 900 }}>Calendario</div>
-            <div style={{ color: "var(--muted)", fontSize: 13 }}>Clic en un día para ver sus citas.</div>
+            <div style={MUTED_SMALL}>Clic en un día para ver sus citas.</div>
           </div>
 
           <div style={{ display: "flex", gap: 8, flexWrap: "wrap", justifyContent: "flex-end" }}>
@@ -2854,27 +3070,29 @@ function AgendaView(props: AgendaViewProps) {
           </div>
         </div>
 
-        <div style={{ height: 12 }} />
+        <div style={SPACER_12} />
 
         <div className="najuCalHead">
-          {["Lun", "Mar", "Mié", "Jue", "Vie", "Sáb", "Dom"].map((d) => (
+          {CAL_DOW.map((d) => (
             <div key={d} className="najuCalDow">
               {d}
             </div>
           ))}
         </div>
 
-        <div className="najuCalGrid">
-          {days.map((d) => {
-            const k = toDayKeyLocal(d);
+        {/* Celdas con key por posición: al cambiar de mes React reutiliza los mismos
+            botones y solo actualiza texto/clases. Un único handler delegado. */}
+        <div className="najuCalGrid" onClick={onCalClick}>
+          {days.map((d, i) => {
+            const k = keys[i];
             const count = (apptByDay[k] || []).length;
             const inMonth = d.getMonth() === monthCursor.getMonth();
             const isSel = dayKey === k;
             return (
               <button
-                key={k}
+                key={i}
                 className={"najuCalCell " + (inMonth ? "" : "isDim ") + (isSel ? "isSel" : "")}
-                onClick={() => setDayKey(isSel ? null : k)}
+                data-day={k}
                 title={k}
               >
                 <div className="najuCalNum">{d.getDate()}</div>
@@ -2886,7 +3104,7 @@ function AgendaView(props: AgendaViewProps) {
 
         {dayKey ? (
           <div style={{ marginTop: 14 }}>
-            <div style={{ display: "flex", justifyContent: "space-between", alignItems: "center", gap: 10 }}>
+            <div style={HEADER_ROW}>
               <div style={{ fontWeight: 900 }}>Citas del {dayKey}</div>
               <button className="pillBtn" onClick={() => setDayKey(null)}>
                 Cerrar
@@ -2894,7 +3112,7 @@ function AgendaView(props: AgendaViewProps) {
             </div>
             <div style={{ height: 10 }} />
             {selectedList.length === 0 ? (
-              <div style={{ color: "var(--muted)" }}>Sin citas.</div>
+              <div style={MUTED_TEXT}>Sin citas.</div>
             ) : (
               <div className="list">
                 {selectedList.map((a) => (
@@ -2905,7 +3123,7 @@ function AgendaView(props: AgendaViewProps) {
                         {a.title} · {patientName[a.patient_id] || "Paciente"}
                       </div>
                       <div className="fileSub">
-                        {fmt(a.start_iso)} → {fmt(a.end_iso)}
+                        {isoToNice(a.start_iso)} → {isoToNice(a.end_iso)}
                       </div>
                     </div>
                     <button className="smallBtn" onClick={() => onJumpToPatient(a.patient_id)}>
@@ -2923,14 +3141,14 @@ function AgendaView(props: AgendaViewProps) {
         <div style={{ display: "flex", justifyContent: "space-between", gap: 10, alignItems: "center" }}>
           <div>
             <div style={{ fontWeight: 900 }}>Próximas citas</div>
-            <div style={{ color: "var(--muted)", fontSize: 13 }}>Lista rápida (máximo 30).</div>
+            <div style={MUTED_SMALL}>Lista rápida (máximo 30).</div>
           </div>
         </div>
 
-        <div style={{ height: 12 }} />
+        <div style={SPACER_12} />
 
         {upcoming.length === 0 ? (
-          <div style={{ color: "var(--muted)" }}>Aún no hay citas.</div>
+          <div style={MUTED_TEXT}>Aún no hay citas.</div>
         ) : (
           <div className="list">
             {upcoming.map((a) => (
@@ -2941,7 +3159,7 @@ function AgendaView(props: AgendaViewProps) {
                     {a.title} · {patientName[a.patient_id] || "Paciente"}
                   </div>
                   <div className="fileSub">
-                    {fmt(a.start_iso)} → {fmt(a.end_iso)}
+                    {isoToNice(a.start_iso)} → {isoToNice(a.end_iso)}
                   </div>
                 </div>
                 <button className="smallBtn" onClick={() => onJumpToPatient(a.patient_id)}>
@@ -2973,14 +3191,6 @@ function CitasSection(props: CitasSectionProps) {
   const [title, setTitle] = useState("");
   const [notes, setNotes] = useState("");
 
-  function fmt(iso: string) {
-    try {
-      return new Date(iso).toLocaleString();
-    } catch {
-      return iso;
-    }
-  }
-
   async function submit() {
     const s = startLocal.trim();
     if (!s) return;
@@ -2994,7 +3204,7 @@ function CitasSection(props: CitasSectionProps) {
       title: (title || "").trim() || `Cita - ${patient.name}`,
       start_iso: start.toISOString(),
       end_iso: end.toISOString(),
-      notes: notes.trim() ? notes.trim() : null,
+      notes: trimOrNull(notes),
     });
 
     setStartLocal("");
@@ -3006,10 +3216,10 @@ function CitasSection(props: CitasSectionProps) {
   return (
     <div className="grid2">
       <div className="card">
-        <div style={{ display: "flex", justifyContent: "space-between", alignItems: "center", gap: 10 }}>
+        <div style={HEADER_ROW}>
           <div>
             <div style={{ fontWeight: 900 }}>Nueva cita</div>
-            <div style={{ color: "var(--muted)", fontSize: 13 }}>Se guarda en NAJU y luego puedes exportarla.</div>
+            <div style={MUTED_SMALL}>Se guarda en NAJU y luego puedes exportarla.</div>
           </div>
           <div style={{ display: "flex", gap: 8, flexWrap: "wrap", justifyContent: "flex-end" }}>
             <button className="pillBtn primary" onClick={onExportPatient}>
@@ -3021,7 +3231,7 @@ function CitasSection(props: CitasSectionProps) {
           </div>
         </div>
 
-        <div style={{ height: 12 }} />
+        <div style={SPACER_12} />
 
         <div style={{ display: "grid", gap: 10 }}>
           <div className="grid2" style={{ gridTemplateColumns: "1fr 140px" }}>
@@ -3053,17 +3263,17 @@ function CitasSection(props: CitasSectionProps) {
       </div>
 
       <div className="card">
-        <div style={{ display: "flex", justifyContent: "space-between", alignItems: "center", gap: 10 }}>
+        <div style={HEADER_ROW}>
           <div>
             <div style={{ fontWeight: 900 }}>Citas del paciente</div>
-            <div style={{ color: "var(--muted)", fontSize: 13 }}>{appointments.length} registradas.</div>
+            <div style={MUTED_SMALL}>{appointments.length} registradas.</div>
           </div>
         </div>
 
-        <div style={{ height: 12 }} />
+        <div style={SPACER_12} />
 
         {appointments.length === 0 ? (
-          <div style={{ color: "var(--muted)" }}>Aún no hay citas.</div>
+          <div style={MUTED_TEXT}>Aún no hay citas.</div>
         ) : (
           <div className="list">
             {appointments.map((a) => (
@@ -3072,7 +3282,7 @@ function CitasSection(props: CitasSectionProps) {
                 <div className="fileMeta">
                   <div className="fileName">{a.title}</div>
                   <div className="fileSub">
-                    {fmt(a.start_iso)} → {fmt(a.end_iso)}
+                    {isoToNice(a.start_iso)} → {isoToNice(a.end_iso)}
                   </div>
                 </div>
                 <button className="smallBtn danger" onClick={() => onDelete(a.id)}>
@@ -3101,11 +3311,15 @@ export default function App() {
   });
 
   useEffect(() => {
-    document.documentElement.dataset.theme = theme;
+    const root = document.documentElement;
+    // Sin cambio real (montaje inicial repetido, StrictMode): no tocar el DOM,
+    // que forzaría recalcular estilos de toda la página.
+    if (root.dataset.theme === theme) return;
+    root.dataset.theme = theme;
     // ayuda a que inputs/barras nativas usen el esquema correcto
-    (document.documentElement.style as any).colorScheme = theme;
+    (root.style as any).colorScheme = theme;
     try {
-      localStorage.setItem("naju_theme", theme);
+      if (localStorage.getItem("naju_theme") !== theme) localStorage.setItem("naju_theme", theme);
     } catch {
       // ignore
     }
@@ -3209,20 +3423,41 @@ export default function App() {
     [patients, selectedId]
   );
 
-  const filtered = useMemo(() => {
+  // Búsqueda con debounce: al teclear rápido solo se filtra una vez (120 ms tras
+  // la última tecla). Si el término normalizado no cambia, setSearchTerm no
+  // re-renderiza y el filtro memoizado no se recalcula.
+  const [searchTerm, setSearchTerm] = useState("");
+  useEffect(() => {
     const q = query.trim().toLowerCase();
+    const t = window.setTimeout(() => setSearchTerm(q), 120);
+    return () => window.clearTimeout(t);
+  }, [query]);
+
+  // Texto de búsqueda en minúsculas por paciente, armado una vez por cambio de
+  // la lista; cada búsqueda solo hace includes() sobre strings ya preparados.
+  const searchHaystacks = useMemo(
+    () => patients.map((p) => `${p.name} ${p.doc_type ?? ""} ${p.doc_number ?? ""} ${p.insurer ?? ""}`.toLowerCase()),
+    [patients]
+  );
+
+  const filtered = useMemo(() => {
+    const q = searchTerm;
     if (!q) return patients;
-    return patients.filter((p) => {
-      const hay = `${p.name} ${p.doc_type ?? ""} ${p.doc_number ?? ""} ${p.insurer ?? ""}`.toLowerCase();
-      return hay.includes(q);
-    });
-  }, [patients, query]);
+    return patients.filter((_, i) => searchHaystacks[i].includes(q));
+  }, [patients, searchHaystacks, searchTerm]);
 
   const fileGroups = useMemo(() => {
-    const attachments = files.filter((f) => f.kind === "attachment");
-    const exams = files.filter((f) => f.kind === "exam");
-    const notes = files.filter((f) => f.kind === "note");
-    const photos = files.filter((f) => f.kind === "photo");
+    // Una sola pasada clasificando por kind (antes: cuatro filter sobre files).
+    const attachments: PatientFile[] = [];
+    const exams: PatientFile[] = [];
+    const notes: PatientFile[] = [];
+    const photos: PatientFile[] = [];
+    for (const f of files) {
+      if (f.kind === "attachment") attachments.push(f);
+      else if (f.kind === "exam") exams.push(f);
+      else if (f.kind === "note") notes.push(f);
+      else if (f.kind === "photo") photos.push(f);
+    }
     return { attachments, exams, notes, photos };
   }, [files]);
 
@@ -3322,7 +3557,8 @@ export default function App() {
 
   async function refreshPatients() {
     const list = await listPatients("");
-    setPatients(list);
+    // Sin cambios reales: se conserva el array previo y no se re-renderiza la lista.
+    setPatients((prev) => (sameItems(prev, list) ? prev : list));
     // Si el seleccionado ya no existe, lo limpiamos
     if (selectedId && !list.some((p) => p.id === selectedId)) {
       setSelectedId(null);
@@ -3333,12 +3569,12 @@ export default function App() {
 
   async function refreshFiles(pid: string) {
     const f = await listPatientFiles(pid);
-    setFiles(f);
+    setFiles((prev) => (sameItems(prev, f) ? prev : f));
   }
 
   async function refreshAllFiles() {
     const f = await listAllFiles();
-    setAllFiles(f);
+    setAllFiles((prev) => (sameItems(prev, f) ? prev : f));
   }
 
   async function refreshAppointments() {
@@ -3352,14 +3588,30 @@ export default function App() {
     setErrorReports(list);
   }
 
+  // Refresco agrupado: lo pedido se carga en paralelo y los setState llegan
+  // juntos, así React hace un solo render en vez de uno por cada await.
+  async function refreshData(what: {
+    patients?: boolean;
+    files?: string;
+    allFiles?: boolean;
+    appointments?: boolean;
+    errors?: boolean;
+  }) {
+    const jobs: Promise<void>[] = [];
+    if (what.patients) jobs.push(refreshPatients());
+    if (what.files) jobs.push(refreshFiles(what.files));
+    if (what.allFiles) jobs.push(refreshAllFiles());
+    if (what.appointments) jobs.push(refreshAppointments());
+    if (what.errors) jobs.push(refreshErrorReports());
+    await Promise.all(jobs);
+  }
+
 
   useEffect(() => {
     (async () => {
       try {
-        await refreshPatients();
-        await refreshAllFiles();
-        await refreshAppointments();
-        await refreshErrorReports();
+        // Independientes: se piden en paralelo (el store se carga una sola vez).
+        await refreshData({ patients: true, allFiles: true, appointments: true, errors: true });
       } catch (e: any) {
         pushToast({ type: "err", msg: `Error cargando pacientes: ${errMsg(e)}` });
       }
@@ -3409,6 +3661,14 @@ export default function App() {
     // eslint-disable-next-line react-hooks/exhaustive-deps
   }, [selectedId]);
 
+  // Clic/Enter delegados en la lista: un par de handlers para todas las
+  // tarjetas (cada una solo lleva data-id) en vez de dos closures por tarjeta.
+  function onPatientListEvent(e: React.MouseEvent<HTMLDivElement> | React.KeyboardEvent<HTMLDivElement>) {
+    if (e.type === "keydown" && (e as React.KeyboardEvent).key !== "Enter") return;
+    const id = (e.target as HTMLElement).closest<HTMLElement>(".pCard[data-id]")?.dataset.id;
+    if (id) pickPatient(id);
+  }
+
   function pickPatient(id: string, sec: Section = "resumen") {
     startVT(() => {
       setPage("pacientes");
@@ -3417,11 +3677,18 @@ export default function App() {
     });
   }
 
+  // Un solo handler para toda la barra de secciones (delegado vía data-section).
+  // Re-clicar la sección actual no lanza otra view transition.
+  function onSectionClick(e: React.MouseEvent<HTMLDivElement>) {
+    const next = (e.target as HTMLElement).closest<HTMLElement>("[data-section]")?.dataset.section as Section | undefined;
+    if (!next || next === section) return;
+    startVT(() => setSection(next));
+  }
+
   async function onCreatePatient(input: PatientInput) {
     try {
       const p = await createPatient(input);
-      await refreshPatients();
-      await refreshAllFiles();
+      await refreshData({ patients: true, allFiles: true });
       startVT(() => setSelectedId(p.id));
       pushToast({ type: "ok", msg: "Paciente creado ✅" });
       setShowCreate(false);
@@ -3434,8 +3701,10 @@ export default function App() {
     if (!selected) return;
     try {
       const p = await updatePatient(selected.id, input);
-      await refreshPatients();
-      await refreshAllFiles();
+      // Editar la ficha no toca archivos ni otros pacientes: se reemplaza solo
+      // este registro. listPatients ordena por updated_at desc, y el recién
+      // editado es el más reciente, así que va al inicio.
+      setPatients((prev) => [p, ...prev.filter((x) => x.id !== p.id)]);
       startVT(() => setSelectedId(p.id));
       pushToast({ type: "ok", msg: "Paciente actualizado ✅" });
       setShowEdit(false);
@@ -3454,18 +3723,14 @@ export default function App() {
     fileInputRef.current?.click();
   }
 
-  async function actionOpenFile(file: PatientFile) {
-    setPreviewFile(file);
-  }
-
   async function onPhotoSelected(e: React.ChangeEvent<HTMLInputElement>) {
     if (!selected) return;
     const file = e.target.files?.[0];
     if (!file) return;
     try {
-      await setPatientPhoto(selected.id, file);
-      await refreshPatients();
-      await refreshAllFiles();
+      const pid = selected.id;
+      await setPatientPhoto(pid, file, (photo) => loadThumb(pid, photo));
+      await refreshData({ patients: true, allFiles: true });
       pushToast({ type: "ok", msg: "Foto actualizada ✅" });
     } catch (err: any) {
       pushToast({ type: "err", msg: `Error foto: ${errMsg(err)}` });
@@ -3480,8 +3745,7 @@ export default function App() {
     if (!files.length) return;
     try {
       await importFiles(selected.id, files);
-      await refreshFiles(selected.id);
-      await refreshAllFiles();
+      await refreshData({ files: selected.id, allFiles: true });
       pushToast({ type: "ok", msg: "Archivos adjuntados ✅" });
       startVT(() => setSection("archivos"));
     } catch (err: any) {
@@ -3508,8 +3772,7 @@ export default function App() {
     if (!ok) return;
     try {
       await deletePatient(selected.id);
-      await refreshPatients();
-      await refreshAllFiles();
+      await refreshData({ patients: true, allFiles: true });
       pushToast({ type: "ok", msg: "Paciente eliminado ✅" });
     } catch (e: any) {
       pushToast({ type: "err", msg: `No se pudo eliminar: ${errMsg(e)}` });
@@ -3617,49 +3880,24 @@ export default function App() {
             />
           </div>
 
-          <div className="patientList">
+          <div className="patientList" onClick={onPatientListEvent} onKeyDown={onPatientListEvent}>
             {filtered.length === 0 ? (
               <div className="card">
                 <div style={{ fontWeight: 800, marginBottom: 6 }}>Sin resultados</div>
-                <div style={{ color: "var(--muted)", fontSize: 13 }}>
+                <div style={MUTED_SMALL}>
                   Prueba otro texto de búsqueda o crea un paciente.
                 </div>
               </div>
             ) : null}
 
-            {filtered.map((p) => {
-              const age = calcAge(p.birth_date);
-              const img = p.photo_path ?? null;
-              const profile = profileByPatientMap.get(p.id);
-
-              return (
-                <div
-                  key={p.id}
-                  className="pCard"
-                  role="button"
-                  tabIndex={0}
-                  aria-current={p.id === selectedId ? "true" : "false"}
-                  onClick={() => pickPatient(p.id)}
-                  onKeyDown={(e) => (e.key === "Enter" ? pickPatient(p.id) : null)}
-                >
-                  <span className="profileDot" style={{ background: profile?.accent ?? "#c7a45a" }} />
-                  <div className="avatar">
-                    {img ? <img src={img} alt="Foto paciente" /> : <div className="initials">{initials(p.name)}</div>}
-                  </div>
-
-                  <div className="pMeta">
-                    <div className="pName">{p.name}</div>
-                    <div className="pSub">
-                      {valOrDash(p.doc_type)} {valOrDash(p.doc_number)} · {valOrDash(p.insurer)}
-                    </div>
-                    <div className="badges">
-                      <span className="badge gold">{age === null ? "Edad —" : `${age} años`}</span>
-                      {p.phone ? <span className="badge">{p.phone}</span> : null}
-                    </div>
-                  </div>
-                </div>
-              );
-            })}
+            {filtered.map((p) => (
+              <PatientCard
+                key={p.id}
+                patient={p}
+                current={p.id === selectedId}
+                accent={profileByPatientMap.get(p.id)?.accent ?? "#c7a45a"}
+              />
+            ))}
           </div>
         </aside>
 
@@ -3691,7 +3929,7 @@ export default function App() {
                 <h2 style={{ display: "flex", gap: 10, alignItems: "center", margin: 0 }}>
                   {selectedPhotoSrc ? (
                     <span className="avatar" style={{ width: 42, height: 42, borderRadius: 16 }}>
-                      <img src={selectedPhotoSrc} alt="Foto" />
+                      <img src={selectedPhotoSrc} alt="Foto" decoding="async" />
                     </span>
                   ) : (
                     <span className="avatar" style={{ width: 42, height: 42, borderRadius: 16 }}>
@@ -3725,22 +3963,12 @@ export default function App() {
 
           {page === "pacientes" && selected ? (
             <div className="segWrap">
-              <div className="segmented" role="navigation" aria-label="Secciones del paciente">
-                <button className="segBtn" aria-current={section === "resumen"} onClick={() => startVT(() => setSection("resumen"))}>
-                  Resumen
-                </button>
-                <button className="segBtn" aria-current={section === "examenes"} onClick={() => startVT(() => setSection("examenes"))}>
-                  Exámenes
-                </button>
-                <button className="segBtn" aria-current={section === "notas"} onClick={() => startVT(() => setSection("notas"))}>
-                  Notas
-                </button>
-                <button className="segBtn" aria-current={section === "citas"} onClick={() => startVT(() => setSection("citas"))}>
-                  Citas
-                </button>
-                <button className="segBtn" aria-current={section === "archivos"} onClick={() => startVT(() => setSection("archivos"))}>
-                  Archivos
-                </button>
+              <div className="segmented" role="navigation" aria-label="Secciones del paciente" onClick={onSectionClick}>
+                {SECTION_TABS.map((t) => (
+                  <button key={t.id} className="segBtn" data-section={t.id} aria-current={section === t.id}>
+                    {t.label}
+                  </button>
+                ))}
               </div>
             </div>
           ) : null}
@@ -3763,19 +3991,21 @@ export default function App() {
                 updateBusy={updateBusy}
               />
             ) : page === "errores" ? (
-              <ErrorCenter
-                reports={errorReports}
-                patients={patients}
-                onRefresh={refreshErrorReports}
-                onCreate={async (input) => {
-                  await createErrorReport(input);
-                  await refreshErrorReports();
-                }}
-                onDelete={async (id) => {
-                  await deleteErrorReport(id);
-                  await refreshErrorReports();
-                }}
-              />
+              <Suspense fallback={null}>
+                <ErrorCenter
+                  reports={errorReports}
+                  patients={patients}
+                  onRefresh={refreshErrorReports}
+                  onCreate={async (input) => {
+                    await createErrorReport(input);
+                    await refreshErrorReports();
+                  }}
+                  onDelete={async (id) => {
+                    await deleteErrorReport(id);
+                    await refreshErrorReports();
+                  }}
+                />
+              </Suspense>
             ) : page === "agenda" ? (
               <AgendaView
                 appointments={appointments}
@@ -3873,7 +4103,7 @@ export default function App() {
                   <div className="profileHeader">
                     <div>
                       <div style={{ fontWeight: 800 }}>Perfil del paciente</div>
-                      <div style={{ color: "var(--muted)", fontSize: 13 }}>
+                      <div style={MUTED_SMALL}>
                         Tendencias dinámicas con radar y árbol explicativo del filtro actual.
                       </div>
                     </div>
@@ -4078,33 +4308,24 @@ export default function App() {
               </>
             ) : section === "examenes" ? (
               <div className="card">
-                <div style={{ display: "flex", alignItems: "center", justifyContent: "space-between", gap: 10 }}>
+                <div style={HEADER_ROW}>
                   <div>
                     <div style={{ fontWeight: 800 }}>Exámenes</div>
-                    <div style={{ color: "var(--muted)", fontSize: 13 }}>Examen mental y otros (guardados como JSON).</div>
+                    <div style={MUTED_SMALL}>Examen mental y otros (guardados como JSON).</div>
                   </div>
                   <button className="pillBtn primary" onClick={() => setShowExam(true)}>
                     + examen mental
                   </button>
                 </div>
 
-                <div style={{ height: 12 }} />
+                <div style={SPACER_12} />
 
                 <div className="list">
                   {fileGroups.exams.length === 0 ? (
-                    <div style={{ color: "var(--muted)" }}>Aún no hay exámenes.</div>
+                    <div style={MUTED_TEXT}>Aún no hay exámenes.</div>
                   ) : (
                     fileGroups.exams.map((f) => (
-                      <div key={f.id} className="fileRow">
-                        <div className="fileIcon">{fileIcon(f)}</div>
-                        <div className="fileMeta">
-                          <div className="fileName">{f.filename}</div>
-                          <div className="fileSub">{isoToNice(f.created_at)}</div>
-                        </div>
-                        <button className="smallBtn" onClick={() => actionOpenFile(f)}>
-                          Abrir
-                        </button>
-                      </div>
+                      <FileRow key={f.id} file={f} onOpen={setPreviewFile} />
                     ))
                   )}
                 </div>
@@ -4120,7 +4341,6 @@ export default function App() {
                   try {
                     await createAppointment(payload);
                     await refreshAppointments();
-        await refreshErrorReports();
                     pushToast({ type: "ok", msg: "Cita creada" });
                   } catch (e: any) {
                     pushToast({ type: "err", msg: `No se pudo crear la cita: ${errMsg(e)}` });
@@ -4130,7 +4350,6 @@ export default function App() {
                   try {
                     await deleteAppointment(id);
                     await refreshAppointments();
-        await refreshErrorReports();
                     pushToast({ type: "ok", msg: "Cita eliminada" });
                   } catch (e: any) {
                     pushToast({ type: "err", msg: `No se pudo eliminar: ${errMsg(e)}` });
@@ -4153,66 +4372,48 @@ export default function App() {
               />
             ) : section === "notas" ? (
               <div className="card">
-                <div style={{ display: "flex", alignItems: "center", justifyContent: "space-between", gap: 10 }}>
+                <div style={HEADER_ROW}>
                   <div>
                     <div style={{ fontWeight: 800 }}>Notas</div>
-                    <div style={{ color: "var(--muted)", fontSize: 13 }}>Seguimiento clínico rápido con estado y riesgo.</div>
+                    <div style={MUTED_SMALL}>Seguimiento clínico rápido con estado y riesgo.</div>
                   </div>
                   <button className="pillBtn primary" onClick={() => setShowNote(true)}>
                     + Nueva nota
                   </button>
                 </div>
 
-                <div style={{ height: 12 }} />
+                <div style={SPACER_12} />
 
                 <div className="list">
                   {fileGroups.notes.length === 0 ? (
-                    <div style={{ color: "var(--muted)" }}>Aún no hay notas.</div>
+                    <div style={MUTED_TEXT}>Aún no hay notas.</div>
                   ) : (
                     fileGroups.notes.map((f) => (
-                      <div key={f.id} className="fileRow">
-                        <div className="fileIcon">{fileIcon(f)}</div>
-                        <div className="fileMeta">
-                          <div className="fileName">{f.filename}</div>
-                          <div className="fileSub">{isoToNice(f.created_at)}</div>
-                        </div>
-                        <button className="smallBtn" onClick={() => actionOpenFile(f)}>
-                          Abrir
-                        </button>
-                      </div>
+                      <FileRow key={f.id} file={f} onOpen={setPreviewFile} />
                     ))
                   )}
                 </div>
               </div>
             ) : (
               <div className="card">
-                <div style={{ display: "flex", alignItems: "center", justifyContent: "space-between", gap: 10 }}>
+                <div style={HEADER_ROW}>
                   <div>
                     <div style={{ fontWeight: 800 }}>Archivos</div>
-                    <div style={{ color: "var(--muted)", fontSize: 13 }}>Adjuntos del paciente (PDF, imágenes, etc.).</div>
+                    <div style={MUTED_SMALL}>Adjuntos del paciente (PDF, imágenes, etc.).</div>
                   </div>
                   <button className="pillBtn primary" onClick={actionAttachFiles}>
                     + Adjuntar
                   </button>
                 </div>
 
-                <div style={{ height: 12 }} />
+                <div style={SPACER_12} />
 
                 <div className="list">
                   {fileGroups.attachments.length === 0 ? (
-                    <div style={{ color: "var(--muted)" }}>Aún no hay archivos adjuntos.</div>
+                    <div style={MUTED_TEXT}>Aún no hay archivos adjuntos.</div>
                   ) : (
                     fileGroups.attachments.map((f) => (
-                      <div key={f.id} className="fileRow">
-                        <div className="fileIcon">{fileIcon(f)}</div>
-                        <div className="fileMeta">
-                          <div className="fileName">{f.filename}</div>
-                          <div className="fileSub">{isoToNice(f.created_at)}</div>
-                        </div>
-                        <button className="smallBtn" onClick={() => actionOpenFile(f)}>
-                          Abrir
-                        </button>
-                      </div>
+                      <FileRow key={f.id} file={f} onOpen={setPreviewFile} />
                     ))
                   )}
                 </div>
@@ -4261,10 +4462,7 @@ export default function App() {
           patient={selected}
           onClose={() => setShowExam(false)}
           onCreated={async () => {
-            await refreshFiles(selected.id);
-            await refreshAllFiles();
-        await refreshAppointments();
-        await refreshErrorReports();
+            await refreshData({ files: selected.id, allFiles: true });
             pushToast({ type: "ok", msg: "Examen creado ✅" });
             startVT(() => setSection("examenes"));
           }}
@@ -4276,10 +4474,7 @@ export default function App() {
           patient={selected}
           onClose={() => setShowNote(false)}
           onCreated={async () => {
-            await refreshFiles(selected.id);
-            await refreshAllFiles();
-        await refreshAppointments();
-        await refreshErrorReports();
+            await refreshData({ files: selected.id, allFiles: true });
             pushToast({ type: "ok", msg: "Nota creada ✅" });
             startVT(() => setSection("notas"));
           }}
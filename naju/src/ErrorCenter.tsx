@@ -9,6 +9,28 @@ function errMsg(e: any) {
   try { return JSON.stringify(e); } catch { return String(e); }
 }
 
+// Todo el formulario en un solo estado: limpiar tras guardar es un único
+// setState (un render) en vez de siete.
+type ReportForm = {
+  title: string;
+  severity: "baja" | "media" | "alta";
+  patientId: string;
+  description: string;
+  steps: string;
+  expected: string;
+  actual: string;
+};
+
+const EMPTY_FORM: ReportForm = {
+  title: "",
+  severity: "media",
+  patientId: "",
+  description: "",
+  steps: "",
+  expected: "",
+  actual: "",
+};
+
 export default function ErrorCenter(props: {
   reports: ErrorReport[];
   patients: Patient[];
@@ -16,16 +38,14 @@ export default function ErrorCenter(props: {
   onDelete: (id: number) => Promise<void>;
   onRefresh: () => Promise<void>;
 }) {
-  const [title, setTitle] = useState("");
-  const [severity, setSeverity] = useState<"baja" | "media" | "alta">("media");
-  const [patientId, setPatientId] = useState<string>("");
-  const [description, setDescription] = useState("");
-  const [steps, setSteps] = useState("");
-  const [expected, setExpected] = useState("");
-  const [actual, setActual] = useState("");
+  const [form, setForm] = useState<ReportForm>(EMPTY_FORM);
   const [toast, setToast] = useState<{ type: "ok" | "err"; msg: string } | null>(null);
   const [busy, setBusy] = useState(false);
 
+  function setField<K extends keyof ReportForm>(key: K, value: ReportForm[K]) {
+    setForm((prev) => (prev[key] === value ? prev : { ...prev, [key]: value }));
+  }
+
   const byId = useMemo(() => {
     const m = new Map<string, string>();
     props.patients.forEach((p) => m.set(p.id, p.name));
@@ -50,25 +70,19 @@ export default function ErrorCenter(props: {
         url: location.href,
         time: new Date().toISOString(),
       };
+      // onCreate ya recarga la lista de reportes.
       await props.onCreate({
-        title,
-        severity,
-        patient_id: patientId ? patientId : null,
-        description,
-        steps: steps.trim() ? steps : null,
-        expected: expected.trim() ? expected : null,
-        actual: actual.trim() ? actual : null,
+        title: form.title,
+        severity: form.severity,
+        patient_id: form.patientId ? form.patientId : null,
+        description: form.description,
+        steps: form.steps.trim() ? form.steps : null,
+        expected: form.expected.trim() ? form.expected : null,
+        actual: form.actual.trim() ? form.actual : null,
         context: ctx,
       });
-      setTitle("");
-      setSeverity("media");
-      setPatientId("");
-      setDescription("");
-      setSteps("");
-      setExpected("");
-      setActual("");
+      setForm(EMPTY_FORM);
       setToast({ type: "ok", msg: "Reporte guardado ✅" });
-      await props.onRefresh();
     } catch (e: any) {
       setToast({ type: "err", msg: errMsg(e) });
     } finally {
@@ -107,13 +121,13 @@ export default function ErrorCenter(props: {
 
           <div className="field">
             <div className="label">Título</div>
-            <input className="input" value={title} onChange={(e) => setTitle(e.target.value)} placeholder="Ej: No guarda una nota" />
+            <input className="input" value={form.title} onChange={(e) => setField("title", e.target.value)} placeholder="Ej: No guarda una nota" />
           </div>
 
           <div className="grid2" style={{ gridTemplateColumns: "1fr 1fr" }}>
             <div className="field">
               <div className="label">Severidad</div>
-              <select className="input" value={severity} onChange={(e) => setSeverity(e.target.value as any)}>
+              <select className="input" value={form.severity} onChange={(e) => setField("severity", e.target.value as ReportForm["severity"])}>
                 <option value="baja">Baja</option>
                 <option value="media">Media</option>
                 <option value="alta">Alta</option>
@@ -122,7 +136,7 @@ export default function ErrorCenter(props: {
 
             <div className="field">
               <div className="label">Paciente (opcional)</div>
-              <select className="input" value={patientId} onChange={(e) => setPatientId(e.target.value)}>
+              <select className="input" value={form.patientId} onChange={(e) => setField("patientId", e.target.value)}>
                 <option value="">—</option>
                 {props.patients.map((p) => (
                   <option key={p.id} value={p.id}>{p.name}</option>
@@ -133,22 +147,22 @@ export default function ErrorCenter(props: {
 
           <div className="field">
             <div className="label">Descripción</div>
-            <textarea className="textarea" value={description} onChange={(e) => setDescription(e.target.value)} placeholder="Qué pasó, cuándo y dónde." />
+            <textarea className="textarea" value={form.description} onChange={(e) => setField("description", e.target.value)} placeholder="Qué pasó, cuándo y dónde." />
           </div>
 
           <div className="field">
             <div className="label">Pasos para reproducir (opcional)</div>
-            <textarea className="textarea" value={steps} onChange={(e) => setSteps(e.target.value)} placeholder="1) … 2) … 3) …" />
+            <textarea className="textarea" value={form.steps} onChange={(e) => setField("steps", e.target.value)} placeholder="1) … 2) … 3) …" />
           </div>
 
           <div className="grid2" style={{ gridTemplateColumns: "1fr 1fr" }}>
             <div className="field">
               <div className="label">Esperado (opcional)</div>
-              <textarea className="textarea" value={expected} onChange={(e) => setExpected(e.target.value)} placeholder="Qué esperabas que pasara." />
+              <textarea className="textarea" value={form.expected} onChange={(e) => setField("expected", e.target.value)} placeholder="Qué esperabas que pasara." />
             </div>
             <div className="field">
               <div className="label">Actual (opcional)</div>
-              <textarea className="textarea" value={actual} onChange={(e) => setActual(e.target.value)} placeholder="Qué pasó realmente." />
+              <textarea className="textarea" value={form.actual} onChange={(e) => setField("actual", e.target.value)} placeholder="Qué pasó realmente." />
             </div>
           </div>
 
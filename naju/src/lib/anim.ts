@@ -0,0 +1,67 @@
+// Shared animation ticker: every active animation (radar, árbol, zoom reset…)
+// runs inside a single requestAnimationFrame callback instead of one rAF each.
+
+/** Frame callback. Return `true` to keep running on the next frame. */
+export type FrameFn = (now: number) => boolean;
+
+const active = new Set<FrameFn>();
+let rafId: number | null = null;
+
+function tick(now: number) {
+  rafId = null;
+  for (const fn of Array.from(active)) {
+    if (!active.has(fn)) continue; // cancelado durante este mismo frame
+    let keep = false;
+    try {
+      keep = fn(now);
+    } catch (e) {
+      // Se descarta la animación pero el error sigue llegando a la consola
+      // (fuera de este bucle, para no cortar las demás animaciones del frame).
+      queueMicrotask(() => {
+        throw e;
+      });
+      keep = false;
+    }
+    if (!keep) active.delete(fn);
+  }
+  // Un onFrame llamado desde un callback ya agendó el siguiente frame (rafId era
+  // null durante el tick): no se pide un segundo rAF.
+  if (active.size && rafId === null) rafId = requestAnimationFrame(tick);
+}
+
+/**
+ * Registers `fn` on the shared ticker.
+ * Returns a cancel function (safe to call more than once).
+ */
+export function onFrame(fn: FrameFn): () => void {
+  active.add(fn);
+  if (rafId === null) rafId = requestAnimationFrame(tick);
+  return () => {
+    active.delete(fn);
+    if (!active.size && rafId !== null) {
+      cancelAnimationFrame(rafId);
+      rafId = null;
+    }
+  };
+}
+
+/**
+ * Cubic ease-out (1 - (1 - t)^3) with plain multiplications:
+ * avoids Math.pow on every frame of every animation.
+ */
+export function easeOutCubic(t: number) {
+  const u = 1 - t;
+  return 1 - u * u * u;
+}
+
+// Una sola MediaQueryList para toda la app: matchMedia parsea la query y crea
+// un objeto nuevo en cada llamada; .matches se mantiene al día por sí solo.
+const reducedMotionMql =
+  typeof window !== "undefined" && typeof window.matchMedia === "function"
+    ? window.matchMedia("(prefers-reduced-motion: reduce)")
+    : null;
+
+/** True when the user asked the OS to minimise animations. */
+export function prefersReducedMotion() {
+  return reducedMotionMql?.matches ?? false;
+}
@@ -12,6 +12,8 @@ export type Patient = {
   emergency_contact: string | null;
   notes: string | null;
   photo_path: string | null;
+  /** Avatar-size thumbnail built at import (absent on older records). */
+  photo_thumb?: string | null;
   drive_folder_id?: string | null;
   created_at: string;
   updated_at: string;
@@ -96,9 +98,14 @@ type Store = {
   nextFileId: number;
   nextAppointmentId: number;
   nextErrorId: number;
+  /** ms timestamp of the last persistStore; picks the newer copy on load. */
+  saved_at: number;
 };
 
 const STORAGE_KEY = "naju_web_store";
+// Sello del último guardado en localStorage, aparte: compararlo al arrancar no
+// obliga a parsear el mirror completo (varios MB).
+const STORAGE_SAVED_AT_KEY = "naju_web_store_saved_at";
 // Dev-only endpoint (served by Vite middleware) that persists the store inside the project folder.
 // Falls back to localStorage automatically when the endpoint is not available.
 const FILE_STORE_ENDPOINT = "/__naju_store";
@@ -114,23 +121,30 @@ function normalizeStore(input: any): Store {
     nextFileId: typeof input?.nextFileId === "number" ? input.nextFileId : 1,
     nextAppointmentId: typeof input?.nextAppointmentId === "number" ? input.nextAppointmentId : 1,
     nextErrorId: typeof input?.nextErrorId === "number" ? input.nextErrorId : 1,
+    saved_at: typeof input?.saved_at === "number" ? input.saved_at : 0,
   };
 }
 
 function loadStoreFromLocalStorage(): Store {
   const raw = localStorage.getItem(STORAGE_KEY);
   if (!raw) {
-    return { patients: [], files: [], appointments: [], errorReports: [], nextFileId: 1, nextAppointmentId: 1, nextErrorId: 1 };
+    return { patients: [], files: [], appointments: [], errorReports: [], nextFileId: 1, nextAppointmentId: 1, nextErrorId: 1, saved_at: 0 };
   }
   try {
     return normalizeStore(JSON.parse(raw));
   } catch {
-    return { patients: [], files: [], appointments: [], errorReports: [], nextFileId: 1, nextAppointmentId: 1, nextErrorId: 1 };
+    return { patients: [], files: [], appointments: [], errorReports: [], nextFileId: 1, nextAppointmentId: 1, nextErrorId: 1, saved_at: 0 };
   }
 }
 
-function saveStoreToLocalStorage(store: Store) {
-  localStorage.setItem(STORAGE_KEY, JSON.stringify(store));
+function saveStoreToLocalStorage(store: Store, json = JSON.stringify(store)) {
+  localStorage.setItem(STORAGE_KEY, json);
+  localStorage.setItem(STORAGE_SAVED_AT_KEY, String(store.saved_at));
+}
+
+function localStorageSavedAt() {
+  const n = Number(localStorage.getItem(STORAGE_SAVED_AT_KEY));
+  return Number.isFinite(n) ? n : 0;
 }
 
 async function loadStoreAsync(): Promise<Store> {
@@ -140,6 +154,16 @@ async function loadStoreAsync(): Promise<Store> {
     if (res.ok) {
       const parsed = await res.json();
       const store = normalizeStore(parsed);
+      // El POST al archivo va en segundo plano: si la ventana se cerró antes de
+      // que llegara, localStorage tiene el guardado más reciente. Se usa ese y
+      // se reenvía al archivo en vez de pisarlo con la copia vieja.
+      if (localStorageSavedAt() > store.saved_at) {
+        const local = loadStoreFromLocalStorage();
+        if (local.saved_at > store.saved_at) {
+          queueFileWrite(JSON.stringify(local));
+          return local;
+        }
+      }
       saveStoreToLocalStorage(store); // mirror for backup
       return store;
     }
@@ -149,26 +173,63 @@ async function loadStoreAsync(): Promise<Store> {
   return loadStoreFromLocalStorage();
 }
 
+// Carga en curso: las lecturas concurrentes (p. ej. el arranque de la app, que
+// pide pacientes, archivos, citas y errores a la vez) comparten un solo fetch.
+let storeLoading: Promise<Store> | null = null;
+
 async function getStore(): Promise<Store> {
   if (cachedStore) return cachedStore;
-  cachedStore = await loadStoreAsync();
+  if (!storeLoading) storeLoading = loadStoreAsync();
+  const loaded = await storeLoading;
+  if (!cachedStore) cachedStore = loaded;
   return cachedStore;
 }
 
-async function persistStore(store: Store) {
-  cachedStore = store;
-  saveStoreToLocalStorage(store);
+// Escritura al archivo en segundo plano: las acciones no esperan el POST (que
+// con fotos/audios puede tardar) y las ráfagas se agrupan. Si llegan varios
+// guardados mientras hay un POST en curso, solo se envía el último JSON.
+// localStorage se escribe antes, con su sello saved_at, y loadStoreAsync
+// recupera de ahí lo que no alcanzó a llegar al archivo.
+let pendingFileJson: string | null = null;
+let fileWriteRunning = false;
+
+async function flushFileStore() {
+  fileWriteRunning = true;
   try {
-    await fetch(FILE_STORE_ENDPOINT, {
-      method: "POST",
-      headers: { "Content-Type": "application/json" },
-      body: JSON.stringify(store),
-    });
-  } catch {
-    // ignore (localStorage already persisted)
+    while (pendingFileJson !== null) {
+      const body = pendingFileJson;
+      pendingFileJson = null;
+      try {
+        await fetch(FILE_STORE_ENDPOINT, {
+          method: "POST",
+          headers: { "Content-Type": "application/json" },
+          body,
+        });
+      } catch {
+        // ignore (localStorage already persisted)
+      }
+    }
+  } finally {
+    fileWriteRunning = false;
   }
 }
 
+function queueFileWrite(json: string) {
+  pendingFileJson = json;
+  if (!fileWriteRunning) void flushFileStore();
+}
+
+async function persistStore(store: Store) {
+  // Monótono aunque dos guardados caigan en el mismo milisegundo.
+  store.saved_at = Math.max(Date.now(), store.saved_at + 1);
+  cachedStore = store;
+  // Se serializa una sola vez (el store incluye data URLs y puede pesar MBs):
+  // el mismo string va a localStorage y al POST.
+  const json = JSON.stringify(store);
+  saveStoreToLocalStorage(store, json);
+  queueFileWrite(json);
+}
+
 function normQuery(q?: string) {
   return (q ?? "").trim().toLowerCase();
 }
@@ -183,12 +244,13 @@ function nowIso() {
   return new Date().toISOString();
 }
 
-function readFileAsDataUrl(file: File): Promise<string> {
+/** Reads a Blob (or File) as a data URL. Shared by photo/attachment import and the audio notes. */
+export function readBlobAsDataUrl(blob: Blob): Promise<string> {
   return new Promise((resolve, reject) => {
     const reader = new FileReader();
     reader.onerror = () => reject(new Error("No se pudo leer el archivo"));
     reader.onload = () => resolve(String(reader.result));
-    reader.readAsDataURL(file);
+    reader.readAsDataURL(blob);
   });
 }
 
@@ -266,14 +328,72 @@ export async function deletePatient(patientId: string): Promise<void> {
   await persistStore(store);
 }
 
-export async function setPatientPhoto(patientId: string, file: File): Promise<Patient> {
+// Lado mayor con el que se guarda la foto del paciente. Una foto de celular
+// (12 MP, varios MB) se reduce al importar: el store, el localStorage y cada
+// decodificación posterior (avatar, perfil) trabajan con ~200 KB.
+const PHOTO_MAX_PX = 1600;
+const PHOTO_JPEG_QUALITY = 0.85;
+
+function canvasToBlob(canvas: HTMLCanvasElement, type: string, quality: number): Promise<Blob | null> {
+  return new Promise((resolve) => canvas.toBlob(resolve, type, quality));
+}
+
+/**
+ * Reads a picked photo as a data URL, downscaled to PHOTO_MAX_PX (JPEG) when larger.
+ * Small images, formats the browser can't decode and re-encodes that come out
+ * bigger keep the original bytes.
+ */
+async function readPhotoAsDataUrl(file: File): Promise<string> {
+  if (typeof createImageBitmap !== "function") return readBlobAsDataUrl(file);
+  let bmp: ImageBitmap | null = null;
+  try {
+    // imageOrientation "from-image" aplica la rotación EXIF antes de reducir.
+    bmp = await createImageBitmap(file, { imageOrientation: "from-image" });
+    const longest = Math.max(bmp.width, bmp.height);
+    if (longest <= PHOTO_MAX_PX) return readBlobAsDataUrl(file);
+
+    const scale = PHOTO_MAX_PX / longest;
+    const canvas = document.createElement("canvas");
+    canvas.width = Math.max(1, Math.round(bmp.width * scale));
+    canvas.height = Math.max(1, Math.round(bmp.height * scale));
+    const ctx = canvas.getContext("2d");
+    if (!ctx) return readBlobAsDataUrl(file);
+    // JPEG no tiene transparencia: fondo blanco en vez de negro para PNGs.
+    ctx.fillStyle = "#fff";
+    ctx.fillRect(0, 0, canvas.width, canvas.height);
+    ctx.imageSmoothingQuality = "high";
+    ctx.drawImage(bmp, 0, 0, canvas.width, canvas.height);
+
+    const blob = await canvasToBlob(canvas, "image/jpeg", PHOTO_JPEG_QUALITY);
+    if (!blob || blob.size >= file.size) return readBlobAsDataUrl(file);
+    return readBlobAsDataUrl(blob);
+  } catch {
+    return readBlobAsDataUrl(file);
+  } finally {
+    bmp?.close();
+  }
+}
+
+/**
+ * Stores the patient's photo. `makeThumb` (provided by the UI) builds the
+ * avatar thumbnail saved next to it; returning the photo itself or null stores none.
+ */
+export async function setPatientPhoto(
+  patientId: string,
+  file: File,
+  makeThumb?: (photo: string) => Promise<string | null>
+): Promise<Patient> {
   const store = await getStore();
   const idx = store.patients.findIndex((p) => p.id === patientId);
   if (idx === -1) throw new Error("Paciente no encontrado");
-  const dataUrl = await readFileAsDataUrl(file);
+  const dataUrl = await readPhotoAsDataUrl(file);
+  // La miniatura del avatar se guarda junto a la foto: al reabrir la app la
+  // lista la muestra directo, sin decodificar ni reducir la foto completa.
+  const thumb = makeThumb ? await makeThumb(dataUrl) : null;
   const updated: Patient = {
     ...store.patients[idx],
     photo_path: dataUrl,
+    photo_thumb: thumb && thumb !== dataUrl ? thumb : null,
     updated_at: nowIso(),
   };
   store.patients[idx] = updated;
@@ -284,9 +404,13 @@ export async function setPatientPhoto(patientId: string, file: File): Promise<Pa
 export async function importFiles(patientId: string, files: File[]): Promise<PatientFile[]> {
   const store = await getStore();
   const createdAt = nowIso();
+  // Lecturas en paralelo (FileReader es asíncrono): el tiempo total es el del
+  // archivo más lento, no la suma. Los ids se asignan después, en orden y sin
+  // awaits de por medio que puedan intercalar otras escrituras al store.
+  const dataUrls = await Promise.all(files.map((file) => readBlobAsDataUrl(file)));
   const newFiles: PatientFile[] = [];
-  for (const file of files) {
-    const dataUrl = await readFileAsDataUrl(file);
+  files.forEach((file, i) => {
+    const dataUrl = dataUrls[i];
     const entry: PatientFile = {
       id: store.nextFileId++,
       patient_id: patientId,
@@ -298,7 +422,7 @@ export async function importFiles(patientId: string, files: File[]): Promise<Pat
     };
     newFiles.push(entry);
     store.files.unshift(entry);
-  }
+  });
   await persistStore(store);
   return newFiles;
 }
@@ -310,15 +434,18 @@ export async function listPatientFiles(patientId: string): Promise<PatientFile[]
 
 export async function listAllFiles(): Promise<PatientFile[]> {
   const store = await getStore();
-  return store.files;
+  // Copia: store.files se muta en sitio (unshift) y la UI compara por referencia.
+  return store.files.slice();
 }
 
 export async function createMentalExam(patientId: string, payload: any): Promise<PatientFile> {
   const store = await getStore();
   const createdAt = nowIso();
   const filename = `examen-${createdAt.slice(0, 10)}.json`;
-  const json = JSON.stringify(payload, null, 2);
-  const dataUrl = `data:application/json;charset=utf-8,${encodeURIComponent(json)}`;
+  // meta_json (lo que lee la app) va compacto; el .json descargable conserva la
+  // sangría para que siga siendo legible al abrirlo.
+  const json = JSON.stringify(payload);
+  const dataUrl = `data:application/json;charset=utf-8,${encodeURIComponent(JSON.stringify(payload, null, 2))}`;
   const entry: PatientFile = {
     id: store.nextFileId++,
     patient_id: patientId,
@@ -337,8 +464,8 @@ export async function createPatientNote(patientId: string, payload: any): Promis
   const store = await getStore();
   const createdAt = nowIso();
   const filename = `nota-${createdAt.slice(0, 10)}.json`;
-  const json = JSON.stringify(payload, null, 2);
-  const dataUrl = `data:application/json;charset=utf-8,${encodeURIComponent(json)}`;
+  const json = JSON.stringify(payload);
+  const dataUrl = `data:application/json;charset=utf-8,${encodeURIComponent(JSON.stringify(payload, null, 2))}`;
   const entry: PatientFile = {
     id: store.nextFileId++,
     patient_id: patientId,
@@ -30,51 +30,44 @@ function escIcsText(input: string) {
 
 function foldLine(line: string) {
   // RFC5545: lines SHOULD be folded at 75 octets. We do a simple char fold.
-  const out: string[] = [];
-  let s = line;
-  while (s.length > 74) {
-    out.push(s.slice(0, 74));
-    s = " " + s.slice(74);
-  }
-  out.push(s);
-  return out.join("\r\n");
+  // Casi todas las líneas son cortas: se devuelven tal cual, sin arrays ni join.
+  if (line.length <= 74) return line;
+  let out = line.slice(0, 74);
+  // Cada continuación empieza con un espacio, así que lleva 73 caracteres útiles.
+  for (let i = 74; i < line.length; i += 73) out += "\r\n " + line.slice(i, i + 73);
+  return out;
 }
 
-export function appointmentsToIcs(appointments: Appointment[], patientNameById: Record<string, string>) {
-  const lines: string[] = [];
-  lines.push("BEGIN:VCALENDAR");
-  lines.push("VERSION:2.0");
-  lines.push("PRODID:-//NAJU//Agenda//ES");
-  lines.push("CALSCALE:GREGORIAN");
-  lines.push("METHOD:PUBLISH");
+const ICS_HEAD = "BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//NAJU//Agenda//ES\r\nCALSCALE:GREGORIAN\r\nMETHOD:PUBLISH\r\n";
 
+export function appointmentsToIcs(appointments: Appointment[], patientNameById: Record<string, string>) {
   const dtstamp = toIcsUtc(new Date().toISOString());
 
+  // El documento se arma directamente como texto: las líneas constantes ya van
+  // con su CRLF y solo las que llevan datos pasan por foldLine.
+  let out = ICS_HEAD;
   for (const a of appointments.slice().sort((x, y) => Date.parse(x.start_iso) - Date.parse(y.start_iso))) {
     const uid = `naju-${a.id}@naju.local`;
     const pname = patientNameById[a.patient_id] || "Paciente";
     const summary = escIcsText(`${a.title} · ${pname}`);
-    const descParts: string[] = [];
-    descParts.push(`Paciente: ${pname}`);
-    descParts.push(`PatientId: ${a.patient_id}`);
-    if (a.notes) descParts.push(`Notas: ${a.notes}`);
-    const description = escIcsText(descParts.join("\n"));
-
-    lines.push("BEGIN:VEVENT");
-    lines.push(`UID:${uid}`);
-    lines.push(`DTSTAMP:${dtstamp}`);
+    const description = escIcsText(
+      `Paciente: ${pname}\nPatientId: ${a.patient_id}` + (a.notes ? `\nNotas: ${a.notes}` : "")
+    );
     const ds = toIcsUtc(a.start_iso);
     const de = toIcsUtc(a.end_iso);
-    if (ds) lines.push(`DTSTART:${ds}`);
-    if (de) lines.push(`DTEND:${de}`);
-    lines.push(`SUMMARY:${summary}`);
-    lines.push(`DESCRIPTION:${description}`);
-    lines.push("END:VEVENT");
-  }
 
-  lines.push("END:VCALENDAR");
+    out +=
+      "BEGIN:VEVENT\r\n" +
+      `${foldLine(`UID:${uid}`)}\r\n` +
+      `DTSTAMP:${dtstamp}\r\n` +
+      (ds ? `DTSTART:${ds}\r\n` : "") +
+      (de ? `DTEND:${de}\r\n` : "") +
+      `${foldLine(`SUMMARY:${summary}`)}\r\n` +
+      `${foldLine(`DESCRIPTION:${description}`)}\r\n` +
+      "END:VEVENT\r\n";
+  }
 
-  return lines.map((l) => foldLine(l)).join("\r\n") + "\r\n";
+  return out + "END:VCALENDAR\r\n";
 }
 
 function csvEscape(val: string) {
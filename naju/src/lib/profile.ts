@@ -2,19 +2,49 @@ import type { Patient, PatientFile } from "./api";
 
 type ProfileMeta = { values: number[]; accent: string; label: string | null };
 
+// Último resultado por paciente junto con los archivos de los que salió. Si un
+// paciente conserva exactamente los mismos archivos, se reutiliza su perfil
+// sin volver a parsear los JSON de exámenes/notas.
+let metaCache = new Map<string, { files: PatientFile[]; meta: ProfileMeta }>();
+
+function sameFiles(a: PatientFile[], b: PatientFile[]) {
+  if (a.length !== b.length) return false;
+  for (let i = 0; i < a.length; i++) if (a[i] !== b[i]) return false;
+  return true;
+}
+
 export function buildProfileMap(
   patients: Patient[],
   allFiles: PatientFile[],
   getAxisValues: (files: PatientFile[]) => { values: number[]; dominant: { label: string; value: number } | null },
   profileColors: Record<string, string>
 ) {
+  // Agrupa una sola vez: O(F) en lugar de filtrar allFiles por cada paciente (O(P·F)).
+  const filesByPatient = new Map<string, PatientFile[]>();
+  for (const f of allFiles) {
+    const list = filesByPatient.get(f.patient_id);
+    if (list) list.push(f);
+    else filesByPatient.set(f.patient_id, [f]);
+  }
+
   const map = new Map<string, ProfileMeta>();
+  const nextCache = new Map<string, { files: PatientFile[]; meta: ProfileMeta }>();
   patients.forEach((patient) => {
-    const patientFiles = allFiles.filter((f) => f.patient_id === patient.id);
+    const patientFiles = filesByPatient.get(patient.id) ?? [];
+    const cached = metaCache.get(patient.id);
+    if (cached && sameFiles(cached.files, patientFiles)) {
+      map.set(patient.id, cached.meta);
+      nextCache.set(patient.id, cached);
+      return;
+    }
     const { values, dominant } = getAxisValues(patientFiles);
     const label = dominant?.label ?? null;
     const accent = label ? profileColors[label] : "#c7a45a";
-    map.set(patient.id, { values, accent, label });
+    const meta = { values, accent, label };
+    map.set(patient.id, meta);
+    nextCache.set(patient.id, { files: patientFiles, meta });
   });
+  // Pacientes eliminados salen del caché.
+  metaCache = nextCache;
   return map;
 }
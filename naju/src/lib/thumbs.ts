@@ -0,0 +1,127 @@
+// Miniaturas de avatar para la lista de pacientes.
+// Las fotos se guardan como data URL a tamaño original; la lista solo necesita
+// ~56px, así que decodificamos una vez, reducimos y guardamos el resultado en
+// un caché LRU acotado (no crece con cada paciente visto).
+
+const MAX_THUMBS = 128;
+// 56px de avatar a 2x (pantallas HiDPI).
+const THUMB_PX = 112;
+// JPEG en vez de PNG: ~4–6 KB por miniatura en lugar de decenas de KB.
+const THUMB_JPEG_QUALITY = 0.8;
+
+// Clave corta (id del paciente) -> { src, miniatura }. Antes la clave era la
+// propia data URL: cada búsqueda hasheaba/comparaba varios MB de texto. Con el
+// id, cambiar la foto reemplaza la entrada vieja en O(1) en lugar de dejarla
+// ocupando el caché. Map conserva orden de inserción = LRU.
+const cache = new Map<string, { src: string; thumb: string }>();
+
+function remember(key: string, src: string, thumb: string) {
+  cache.delete(key);
+  cache.set(key, { src, thumb });
+  if (cache.size > MAX_THUMBS) {
+    const oldest = cache.keys().next().value;
+    if (oldest !== undefined) cache.delete(oldest);
+  }
+}
+
+/**
+ * Returns the cached thumbnail for `key` if it was built from `src`
+ * (and marks it as recently used).
+ */
+export function peekThumb(key: string, src: string): string | null {
+  const hit = cache.get(key);
+  if (hit === undefined || hit.src !== src) return null;
+  cache.delete(key);
+  cache.set(key, hit);
+  return hit.thumb;
+}
+
+// Miniaturas en proceso: varias tarjetas con la misma foto (o un re-render
+// antes de terminar) esperan la misma promesa en vez de decodificar otra vez.
+const inflight = new Map<string, { src: string; job: Promise<string> }>();
+
+// El trabajo de miniaturas no es urgente: se agenda cuando el navegador está
+// libre para no competir con la animación de cambio de vista.
+function whenIdle(fn: () => void) {
+  const ric = (window as any).requestIdleCallback as ((cb: () => void, opts?: { timeout: number }) => number) | undefined;
+  if (ric) ric(fn, { timeout: 300 });
+  else window.setTimeout(fn, 16);
+}
+
+/**
+ * Decodes `src` once, downsizes it to avatar size and caches the result
+ * under `key`. Falls back to the original source if anything fails.
+ */
+export function loadThumb(key: string, src: string): Promise<string> {
+  const hit = peekThumb(key, src);
+  if (hit) return Promise.resolve(hit);
+  const pending = inflight.get(key);
+  if (pending && pending.src === src) return pending.job;
+
+  const job = new Promise<string>((resolve) => whenIdle(() => buildThumb(key, src).then(resolve)));
+  const entry = { src, job };
+  inflight.set(key, entry);
+  job.then(() => {
+    if (inflight.get(key) === entry) inflight.delete(key);
+  });
+  return job;
+}
+
+async function buildThumb(key: string, src: string): Promise<string> {
+  try {
+    const img = new Image();
+    img.decoding = "async";
+    img.src = src;
+    // decode() decodifica fuera del hilo principal: una foto grande ya no
+    // bloquea la UI mientras se arma la lista.
+    await img.decode();
+
+    const w0 = img.naturalWidth || 1;
+    const h0 = img.naturalHeight || 1;
+    // El avatar es cuadrado con object-fit: cover, así que basta el cuadrado
+    // central, escalado al lado del avatar.
+    const side = Math.min(w0, h0);
+    if (side <= THUMB_PX) {
+      remember(key, src, src);
+      return src;
+    }
+    const sx = Math.floor((w0 - side) / 2);
+    const sy = Math.floor((h0 - side) / 2);
+
+    const canvas = document.createElement("canvas");
+    canvas.width = THUMB_PX;
+    canvas.height = THUMB_PX;
+    const ctx = canvas.getContext("2d");
+    if (!ctx) throw new Error("2d context no disponible");
+    // Se codifica como JPEG (la miniatura se guarda en el store): fondo blanco
+    // para que las fotos PNG con transparencia no queden en negro.
+    ctx.fillStyle = "#fff";
+    ctx.fillRect(0, 0, THUMB_PX, THUMB_PX);
+
+    // Recorte + reducción nativos con createImageBitmap (el navegador lo hace
+    // fuera del hilo principal); el canvas solo copia 112×112 px para codificar.
+    let drawn = false;
+    if (typeof createImageBitmap === "function") {
+      try {
+        const bmp = await createImageBitmap(img, sx, sy, side, side, {
+          resizeWidth: THUMB_PX,
+          resizeHeight: THUMB_PX,
+          resizeQuality: "medium",
+        });
+        // Navegadores sin soporte de resize devuelven el recorte a tamaño original.
+        ctx.drawImage(bmp, 0, 0, THUMB_PX, THUMB_PX);
+        bmp.close();
+        drawn = true;
+      } catch {
+        drawn = false;
+      }
+    }
+    if (!drawn) ctx.drawImage(img, sx, sy, side, side, 0, 0, THUMB_PX, THUMB_PX);
+
+    const out = canvas.toDataURL("image/jpeg", THUMB_JPEG_QUALITY);
+    remember(key, src, out);
+    return out;
+  } catch {
+    return src;
+  }
+}
@@ -1,6 +1,7 @@
 import { defineConfig, type Plugin } from "vite";
 import react from "@vitejs/plugin-react";
 import fs from "node:fs/promises";
+import { createReadStream, type Stats } from "node:fs";
 import path from "node:path";
 import os from "node:os";
 import { execFile } from "node:child_process";
@@ -38,6 +39,56 @@ function najuStorePlugin(): Plugin {
     await fs.mkdir(storeDir, { recursive: true });
   }
 
+  // Último store.json leído/escrito, indexado por mtime+tamaño: los GET repetidos
+  // (cada refresh de la UI) no vuelven a leer el archivo si no cambió en disco.
+  let storeCache: { mtimeMs: number; size: number; raw: Buffer } | null = null;
+
+  async function readStoreCached() {
+    const st = await fs.stat(storeFile);
+    if (storeCache && storeCache.mtimeMs === st.mtimeMs && storeCache.size === st.size) return storeCache.raw;
+    const raw = await fs.readFile(storeFile);
+    storeCache = { mtimeMs: st.mtimeMs, size: st.size, raw };
+    return raw;
+  }
+
+  // Escritura atómica: se escribe a un .tmp hermano, se sincroniza y se renombra
+  // encima del destino. Un corte a mitad nunca deja un JSON truncado, y los GET
+  // concurrentes ven el archivo viejo o el nuevo, nunca uno a medias.
+  // Contador por escritura: el servidor también recibe POSTs desde la LAN (QR
+  // de notas) y dos escrituras solapadas no deben compartir el mismo .tmp.
+  let tmpSeq = 0;
+
+  async function atomicWrite(file: string, data: Buffer): Promise<Stats> {
+    const tmp = `${file}.${process.pid}.${++tmpSeq}.tmp`;
+    // Cualquier fallo (ENOSPC/EIO al escribir o sincronizar, o el rename) borra
+    // el .tmp: no se acumulan restos junto a store.json.
+    try {
+      const fh = await fs.open(tmp, "w");
+      let st: Stats;
+      try {
+        await fh.writeFile(data);
+        await fh.sync();
+        // Stat del propio .tmp: rename conserva el inodo (y su mtime), así que
+        // describe exactamente estos bytes aunque otra escritura reemplace el
+        // destino justo después.
+        st = await fh.stat();
+      } finally {
+        await fh.close();
+      }
+      await fs.rename(tmp, file);
+      return st;
+    } catch (e) {
+      await fs.rm(tmp, { force: true });
+      throw e;
+    }
+  }
+
+  async function writeStore(raw: string) {
+    const buf = Buffer.from(raw, "utf8");
+    const st = await atomicWrite(storeFile, buf);
+    storeCache = { mtimeMs: st.mtimeMs, size: st.size, raw: buf };
+  }
+
   async function ensureAssetsDir() {
     await fs.mkdir(assetsDir, { recursive: true });
   }
@@ -49,22 +100,32 @@ function najuStorePlugin(): Plugin {
     return norm;
   }
 
+  // Una sola pasada por input: las rachas de caracteres no permitidos (incluidos
+  // "_", "/" y "\\") colapsan a un único "_", así que luego basta con quitar
+  // como mucho un "_" en cada extremo.
+  const ID_BAD_RUN = /[^a-zA-Z0-9-]+/g;
+  const FILE_BAD_RUN = /[^a-zA-Z0-9.-]+/g;
+  const EDGE_UNDERSCORE = /^_|_$/g;
+  // Ids de paciente (UUID) y nombres ya saneados por el cliente llegan limpios:
+  // una sola prueba anclada los devuelve tal cual, sin trim/replace/slice.
+  const SAFE_ID = /^[a-zA-Z0-9-]{1,80}$/;
+  const SAFE_FILE = /^[a-zA-Z0-9.-]{1,160}$/;
+
   function safeId(input: string) {
+    if (SAFE_ID.test(input)) return input;
     return (input || "")
       .trim()
-      .replace(/[^a-zA-Z0-9_-]+/g, "_")
-      .replace(/_+/g, "_")
-      .replace(/^_+|_+$/g, "")
+      .replace(ID_BAD_RUN, "_")
+      .replace(EDGE_UNDERSCORE, "")
       .slice(0, 80) || "unknown";
   }
 
   function safeFileName(input: string) {
+    if (SAFE_FILE.test(input)) return input;
     const cleaned = (input || "")
       .trim()
-      .replace(/[/\\]+/g, "_")
-      .replace(/[^a-zA-Z0-9._-]+/g, "_")
-      .replace(/_+/g, "_")
-      .replace(/^_+|_+$/g, "")
+      .replace(FILE_BAD_RUN, "_")
+      .replace(EDGE_UNDERSCORE, "")
       .slice(0, 160);
     return cleaned || `asset-${Date.now()}`;
   }
@@ -157,11 +218,14 @@ function najuStorePlugin(): Plugin {
         }
 
         try {
-          const version = await readPkgVersion();
-          const head = await execCmd("git", ["rev-parse", "HEAD"], { cwd: repoRoot, timeoutMs: 15_000 });
-
+          // Independientes entre sí: se lanzan a la vez en vez de esperar el
+          // rev-parse local antes de empezar el fetch (lo más lento, va por red).
           // Fetch remote (best-effort). If it fails, still return local info.
-          const fetch = await execCmd("git", ["fetch", "origin", "main", "--prune"], { cwd: repoRoot, timeoutMs: 30_000 });
+          const [version, head, fetch] = await Promise.all([
+            readPkgVersion(),
+            execCmd("git", ["rev-parse", "HEAD"], { cwd: repoRoot, timeoutMs: 15_000 }),
+            execCmd("git", ["fetch", "origin", "main", "--prune"], { cwd: repoRoot, timeoutMs: 30_000 }),
+          ]);
           const remote = fetch.ok
             ? await execCmd("git", ["rev-parse", "origin/main"], { cwd: repoRoot, timeoutMs: 15_000 })
             : { ok: false, code: fetch.code, stdout: "", stderr: fetch.stderr };
@@ -252,14 +316,14 @@ function najuStorePlugin(): Plugin {
 
           if (req.method === "GET") {
             try {
-              const raw = await fs.readFile(storeFile, "utf8");
+              const raw = await readStoreCached();
               res.statusCode = 200;
               res.setHeader("Content-Type", "application/json; charset=utf-8");
               res.setHeader("Cache-Control", "no-store");
               res.end(raw);
               return;
             } catch {
-              await fs.writeFile(storeFile, JSON.stringify(defaultStore, null, 2), "utf8");
+              await writeStore(JSON.stringify(defaultStore, null, 2));
               res.statusCode = 200;
               res.setHeader("Content-Type", "application/json; charset=utf-8");
               res.setHeader("Cache-Control", "no-store");
@@ -269,7 +333,9 @@ function najuStorePlugin(): Plugin {
           }
 
           if (req.method === "POST") {
-            let body = "";
+            // Binario: se acumulan los Buffers y se decodifica una sola vez al final
+            // (sin concatenar strings por chunk ni cortar caracteres multibyte).
+            const chunks: Buffer[] = [];
             let size = 0;
 
             req.on("data", (chunk) => {
@@ -281,13 +347,16 @@ function najuStorePlugin(): Plugin {
                 req.destroy();
                 return;
               }
-              body += chunk.toString("utf8");
+              chunks.push(chunk);
             });
 
             req.on("end", async () => {
               try {
-                const parsed = JSON.parse(body || "{}");
-                await fs.writeFile(storeFile, JSON.stringify(parsed, null, 2), "utf8");
+                const body = Buffer.concat(chunks).toString("utf8");
+                // Solo se valida: el cliente ya envía el store serializado, así que se
+                // escribe tal cual en vez de re-serializarlo con sangría (varios MB).
+                JSON.parse(body || "{}");
+                await writeStore(body || "{}");
                 res.statusCode = 200;
                 res.setHeader("Content-Type", "application/json; charset=utf-8");
                 res.end(JSON.stringify({ ok: true }));
@@ -335,11 +404,17 @@ function najuStorePlugin(): Plugin {
             }
 
             try {
-              const data = await fs.readFile(abs);
+              const st = await fs.stat(abs);
+              if (!st.isFile()) throw new Error("not a file");
               res.statusCode = 200;
               res.setHeader("Content-Type", contentTypeByExt(abs));
+              res.setHeader("Content-Length", String(st.size));
               res.setHeader("Cache-Control", "no-store");
-              res.end(data);
+              // Audios/PDFs pueden pesar decenas de MB: se envían en bloques de 1 MiB
+              // en lugar de cargar el archivo completo en memoria antes de responder.
+              const stream = createReadStream(abs, { highWaterMark: 1024 * 1024 });
+              stream.on("error", () => res.destroy());
+              stream.pipe(res);
             } catch {
               res.statusCode = 404;
               res.setHeader("Content-Type", "application/json; charset=utf-8");
@@ -349,7 +424,7 @@ function najuStorePlugin(): Plugin {
           }
 
           if (req.method === "POST") {
-            let body = "";
+            const chunks: Buffer[] = [];
             let size = 0;
 
             req.on("data", (chunk) => {
@@ -362,11 +437,12 @@ function najuStorePlugin(): Plugin {
                 req.destroy();
                 return;
               }
-              body += chunk.toString("utf8");
+              chunks.push(chunk);
             });
 
             req.on("end", async () => {
               try {
+                const body = Buffer.concat(chunks).toString("utf8");
                 const parsed = JSON.parse(body || "{}");
                 const patientId = safeId(String(parsed.patientId || ""));
                 const filename = safeFileName(String(parsed.filename || ""));
@@ -391,7 +467,7 @@ function najuStorePlugin(): Plugin {
                 }
 
                 const buf = Buffer.from(dataBase64, "base64");
-                await fs.writeFile(abs, buf);
+                await atomicWrite(abs, buf);
 
                 res.statusCode = 200;
                 res.setHeader("Content-Type", "application/json; charset=utf-8");